@@ -0,0 +1,97 @@
+"""Add the columns and indexes that create_all can't add to existing tables
+
+Databases created before shared web analyses, model routing, ETags, the
+requirements API and local scoring lack these on documents and
+compliance_requirements. Tables added since then are created here too, so the
+migration brings an old database fully up to date; on a new database every
+step is skipped.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.database import Base
+from app.models import models  # noqa: F401
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DOCUMENT_COLUMNS = [
+    sa.Column("model_compliance_score", sa.Integer()),
+    sa.Column("source_url", sa.String()),
+    sa.Column("analysis_model", sa.String()),
+    sa.Column("requirements_revision", sa.Integer(), nullable=False, server_default="0"),
+    sa.Column("shared_analysis_id", sa.Integer(), sa.ForeignKey(
+        "shared_analyses.id", name="fk_documents_shared_analysis_id"
+    )),
+]
+
+REQUIREMENT_COLUMNS = [
+    sa.Column("completed_at", sa.DateTime(timezone=True)),
+    sa.Column("owner_id", sa.Integer(), sa.ForeignKey(
+        "users.id", name="fk_compliance_requirements_owner_id"
+    )),
+]
+
+# (table, name, columns)
+INDEXES = [
+    ("documents", "ix_documents_shared_analysis_id", ["shared_analysis_id"]),
+    ("compliance_requirements", "ix_compliance_requirements_document_id", ["document_id"]),
+    ("compliance_requirements", "ix_requirements_owner_id", ["owner_id", "id"]),
+    ("compliance_requirements", "ix_requirements_owner_status_priority", ["owner_id", "status", "priority", "id"]),
+    ("compliance_requirements", "ix_requirements_owner_priority", ["owner_id", "priority", "id"]),
+    ("compliance_requirements", "ix_requirements_owner_category", ["owner_id", "category", "id"]),
+    ("compliance_requirements", "ix_requirements_owner_created", ["owner_id", "created_at", "id"]),
+]
+
+
+def _add_missing_columns(table: str, columns) -> None:
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+    missing = [column for column in columns if column.name not in existing]
+    if missing:
+        with op.batch_alter_table(table) as batch:
+            for column in missing:
+                batch.add_column(column)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # New tables (shared analyses, jobs, leases, telemetry, daily buckets)
+    Base.metadata.create_all(bind=bind)
+
+    _add_missing_columns("documents", DOCUMENT_COLUMNS)
+    _add_missing_columns("compliance_requirements", REQUIREMENT_COLUMNS)
+
+    inspector = sa.inspect(bind)
+    for table, name, columns in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+    # Requirements created before owner_id was denormalized onto them
+    op.execute(
+        "UPDATE compliance_requirements SET owner_id = ("
+        "SELECT documents.owner_id FROM documents WHERE documents.id = compliance_requirements.document_id"
+        ") WHERE owner_id IS NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    with op.batch_alter_table("compliance_requirements") as batch:
+        for column in reversed(REQUIREMENT_COLUMNS):
+            batch.drop_column(column.name)
+    with op.batch_alter_table("documents") as batch:
+        for column in reversed(DOCUMENT_COLUMNS):
+            batch.drop_column(column.name)
@@ -1,21 +1,67 @@
-from fastapi import APIRouter, Depends
+from datetime import date, datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.core.database import get_db
-from app.models.models import User, Document, ComplianceRequirement, DocumentStatus, RequirementStatus
+from app.core.http_cache import make_etag, is_not_modified, not_modified, set_etag
+from app.models.models import (
+    User, UserRole, Document, ComplianceRequirement, DocumentStatus, RequirementStatus, UsageDailyBucket
+)
 from app.services.auth import get_current_user
 from app.services.usage_tracker import usage_tracker
+from app.services.compliance_history import compliance_history
 
 router = APIRouter()
 
+# Dimensions the usage endpoint can group daily buckets by
+USAGE_GROUPS = {
+    "day": UsageDailyBucket.day,
+    "document_type": UsageDailyBucket.document_type,
+    "model": UsageDailyBucket.model,
+    "outcome": UsageDailyBucket.outcome,
+    "operation": UsageDailyBucket.operation,
+    "user": UsageDailyBucket.user_id,
+}
+
+USAGE_SUMS = ["count", "claude_calls", "input_tokens", "output_tokens", "cost_usd", "text_chars", "claude_ms", "total_ms"]
+
+def _usage_entry(values) -> dict:
+    """Summed bucket columns plus averages per analysis"""
+    entry = dict(zip(USAGE_SUMS, (value or 0 for value in values)))
+    entry["cost_usd"] = round(entry["cost_usd"], 6)
+    total_ms, claude_ms = entry.pop("total_ms"), entry.pop("claude_ms")
+    entry["avg_total_ms"] = round(total_ms / entry["count"], 1) if entry["count"] else None
+    entry["avg_claude_ms"] = round(claude_ms / entry["claude_calls"], 1) if entry["claude_calls"] else None
+    return entry
+
 @router.get("/stats")
 async def get_dashboard_stats(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get dashboard statistics for current user"""
     
+    # One grouped query stands in for every input to the stats below
+    version = db.query(
+        Document.status,
+        func.count(Document.id),
+        func.max(Document.id),
+        func.max(Document.processed_at),
+        func.sum(Document.requirements_revision),
+        func.sum(Document.compliance_score)
+    ).filter(
+        Document.owner_id == current_user.id
+    ).group_by(Document.status).order_by(Document.status).all()
+    
+    etag = make_etag("stats", current_user.id, *[tuple(row) for row in version])
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
     # Total documents
     total_docs = db.query(Document).filter(Document.owner_id == current_user.id).count()
     
@@ -67,6 +113,59 @@ async def get_dashboard_stats(
     }
 
 @router.get("/usage")
-async def get_usage_stats():
-    """Get API usage statistics"""
-    return usage_tracker.get_usage_summary()
\ No newline at end of file
+async def get_usage_stats(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group_by: str = Query("day", pattern="^(day|document_type|model|outcome|operation|user)$"),
+    all_users: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Token spend, cost and latency of the current user's analyses, from daily buckets"""
+    if (all_users or group_by == "user") and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can see other users' usage")
+    
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    
+    sums = [func.sum(getattr(UsageDailyBucket, name)) for name in USAGE_SUMS]
+    filters = [UsageDailyBucket.day >= start, UsageDailyBucket.day <= end]
+    if not (all_users or group_by == "user"):
+        filters.append(UsageDailyBucket.user_id == current_user.id)
+    
+    column = USAGE_GROUPS[group_by]
+    groups = db.query(column, *sums).filter(*filters).group_by(column).order_by(column).all()
+    totals = db.query(*sums).filter(*filters).one()
+    
+    return {
+        "start": start,
+        "end": end,
+        "group_by": group_by,
+        "totals": _usage_entry(totals),
+        "groups": [
+            {"key": row[0], **_usage_entry(row[1:])} for row in groups
+        ],
+        # The daily request and token limits are shared by all users
+        "budget": usage_tracker.get_usage_summary()
+    }
+
+@router.get("/history")
+async def get_compliance_history(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    period: str = Query("week", pattern="^(day|week|month)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Compliance score and requirement backlog trends, rolled up from daily buckets"""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(weeks=12)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    
+    return {
+        "start": start,
+        "end": end,
+        "period": period,
+        "series": compliance_history.series(db, current_user.id, start, end, period)
+    }
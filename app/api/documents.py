@@ -1,22 +1,91 @@
+import asyncio
 import os
 import shutil
 from datetime import datetime
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
+from sqlalchemy.orm import Session, defer
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.deadline import get_deadline
+from app.core.http_cache import make_etag, is_not_modified, not_modified, set_etag
 from app.models.models import User, Document, ComplianceRequirement, DocumentType, DocumentStatus
-from app.models.schemas import DocumentResponse, ComplianceRequirement as RequirementSchema
+from app.models.schemas import (
+    DocumentResponse, UrlDocumentCreate, AnalysisResult,
+    QuestionRequest, AnswerResponse, ChunkCitation,
+    ComplianceRequirement as RequirementSchema
+)
 from app.services.auth import get_current_user
 from app.services.document_processor import DocumentProcessor
 from app.services.ai_analyzer import AIAnalyzer
+from app.services.storage_lifecycle import sharded_upload_path
+from app.services.chunk_index import get_chunk_index
+from app.services.telemetry import telemetry, AnalysisTrace
+from app.services.compliance_scorer import compliance_scorer
+from app.services.compliance_history import compliance_history
+from app.services.single_flight import single_flight, analysis_key
+from app.services.shared_analysis import (
+    normalize_url, normalize_content, content_hash,
+    get_shared_analysis, store_shared_analysis, load_analysis
+)
 
 router = APIRouter()
 
-# Create uploads directory if it doesn't exist
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+def _document_version(db: Session, document_id: int, owner_id: int):
+    """Cheap version stamp of a document the user owns, or None if not found"""
+    return db.query(
+        Document.id, Document.status, Document.processed_at,
+        Document.compliance_score, Document.requirements_revision
+    ).filter(
+        Document.id == document_id,
+        Document.owner_id == owner_id
+    ).first()
+
+def _set_outcome(trace: AnalysisTrace, analysis: AnalysisResult):
+    """Record how an analysis was produced on its telemetry trace"""
+    trace.model = analysis.model or trace.model
+    if analysis.fallback:
+        trace.outcome = "fallback"
+    else:
+        # No Claude call of our own: another request's analysis was reused
+        trace.outcome = "analyzed" if trace.claude_calls else "coalesced"
+
+def _save_analysis(db: Session, db_document: Document, analysis: AnalysisResult):
+    """Mark a document completed and store its analysis and requirements"""
+    db_document.status = DocumentStatus.COMPLETED
+    db_document.summary = analysis.summary
+    db_document.compliance_score = compliance_scorer.score(analysis.requirements)
+    db_document.model_compliance_score = None if analysis.fallback else analysis.compliance_score
+    db_document.analysis_model = analysis.model
+    db_document.processed_at = datetime.utcnow()
+    db_document.requirements_revision = (db_document.requirements_revision or 0) + 1
+    
+    for req in analysis.requirements:
+        db_requirement = ComplianceRequirement(
+            document_id=db_document.id,
+            owner_id=db_document.owner_id,
+            requirement_text=req.requirement_text,
+            plain_english=req.plain_english,
+            category=req.category,
+            priority=req.priority,
+            confidence_score=req.confidence_score,
+            source_section=req.source_section
+        )
+        db.add(db_requirement)
+    
+    # Trend buckets change in the same transaction as the document
+    compliance_history.record(
+        db, db_document.owner_id, db_document.processed_at.date(),
+        documents_completed=1,
+        completed_score_sum=db_document.compliance_score,
+        score_delta=db_document.compliance_score,
+        requirements_opened=len(analysis.requirements)
+    )
+    
+    db.commit()
+    db.refresh(db_document)
 
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
@@ -48,9 +117,10 @@ async def upload_document(
     # Save uploaded file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     safe_filename = f"{timestamp}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, safe_filename)
+    file_path = sharded_upload_path(safe_filename)
     
     try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
     except Exception as e:
@@ -74,50 +144,125 @@ async def upload_document(
     db.refresh(db_document)
     
     # Process document in background (simplified for MVP)
+    with telemetry.trace(current_user.id, "analysis", doc_type.value, db_document.id, db_document.file_size) as trace:
+        try:
+            # Extract text off the event loop, within the request's deadline
+            processor = DocumentProcessor()
+            with trace.stage("extract"):
+                extracted_text, _ = await asyncio.wait_for(
+                    run_in_threadpool(processor.extract_text, file_path),
+                    timeout=get_deadline().remaining()
+                )
+            trace.text_chars = len(extracted_text)
+            
+            # Update status to processing
+            db_document.status = DocumentStatus.PROCESSING
+            db_document.extracted_text = extracted_text
+            db.commit()
+            
+            # Analyze with AI; identical concurrent uploads share one analysis
+            analyzer = AIAnalyzer()
+            with trace.stage("analysis"):
+                analysis = await single_flight.run(
+                    analysis_key(extracted_text, doc_type.value),
+                    lambda: analyzer.analyze_document(extracted_text, doc_type.value)
+                )
+            
+            # Update document with analysis
+            with trace.stage("save"):
+                _save_analysis(db, db_document, analysis)
+            _set_outcome(trace, analysis)
+            
+        except asyncio.TimeoutError:
+            trace.outcome = "timeout"
+            db_document.status = DocumentStatus.FAILED
+            db.commit()
+            raise HTTPException(
+                status_code=504,
+                detail="Document processing exceeded the request deadline"
+            )
+        except Exception as e:
+            # Mark as failed
+            db_document.status = DocumentStatus.FAILED
+            db.commit()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Document processing failed: {str(e)}"
+            )
+    
+    return db_document
+
+@router.post("/ingest-url", response_model=DocumentResponse)
+async def ingest_url(
+    page: UrlDocumentCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Analyze a web page submitted by URL, sharing the analysis across users"""
     try:
-        # Extract text
-        processor = DocumentProcessor()
-        extracted_text, _ = processor.extract_text(file_path)
-        
-        # Update status to processing
-        db_document.status = DocumentStatus.PROCESSING
-        db_document.extracted_text = extracted_text
-        db.commit()
-        
-        # Analyze with AI
-        analyzer = AIAnalyzer()
-        analysis = await analyzer.analyze_document(extracted_text, document_type)
+        url_key = normalize_url(page.url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    text = normalize_content(page.content)
+    if not text:
+        raise HTTPException(status_code=400, detail="Page content is empty")
+    digest = content_hash(text)
+    
+    with telemetry.trace(current_user.id, "analysis", page.document_type.value) as trace:
+        trace.text_chars = len(text)
         
-        # Update document with analysis
-        db_document.status = DocumentStatus.COMPLETED
-        db_document.summary = analysis.summary
-        db_document.compliance_score = analysis.compliance_score
-        db_document.processed_at = datetime.utcnow()
-        
-        # Save requirements
-        for req in analysis.requirements:
-            db_requirement = ComplianceRequirement(
-                document_id=db_document.id,
-                requirement_text=req.requirement_text,
-                plain_english=req.plain_english,
-                category=req.category,
-                priority=req.priority,
-                confidence_score=0.8  # Default confidence
-            )
-            db.add(db_requirement)
+        # Unchanged public pages are analyzed once for everyone
+        shared = get_shared_analysis(db, url_key, digest)
+        cached = shared is not None
+        if cached:
+            analysis = load_analysis(shared)
+        else:
+            try:
+                analyzer = AIAnalyzer()
+                with trace.stage("analysis"):
+                    analysis = await single_flight.run(
+                        analysis_key(text, page.document_type.value),
+                        lambda: analyzer.analyze_document(text, page.document_type.value)
+                    )
+            except asyncio.TimeoutError:
+                trace.outcome = "timeout"
+                raise HTTPException(
+                    status_code=504,
+                    detail="Document processing exceeded the request deadline"
+                )
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Document processing failed: {str(e)}"
+                )
+            # Fallbacks are not worth sharing; the next request may get a real analysis
+            if not analysis.fallback:
+                shared = store_shared_analysis(db, url_key, digest, text, analysis)
         
+        db_document = Document(
+            filename=page.title or url_key,
+            file_path=url_key,
+            source_url=url_key,
+            document_type=page.document_type,
+            status=DocumentStatus.PROCESSING,
+            file_size=len(text.encode("utf-8")),
+            # Shared pages keep one copy of the text on the shared analysis
+            extracted_text=None if shared else text,
+            shared_analysis_id=shared.id if shared else None,
+            owner_id=current_user.id
+        )
+        db.add(db_document)
         db.commit()
         db.refresh(db_document)
+        trace.document_id = db_document.id
+        trace.file_size = db_document.file_size
         
-    except Exception as e:
-        # Mark as failed
-        db_document.status = DocumentStatus.FAILED
-        db.commit()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Document processing failed: {str(e)}"
-        )
-    
+        with trace.stage("save"):
+            _save_analysis(db, db_document, analysis)
+        _set_outcome(trace, analysis)
+        if cached:
+            trace.outcome = "shared_cache"
     return db_document
 
 @router.get("/", response_model=List[DocumentResponse])
@@ -126,34 +271,69 @@ async def get_documents(
     current_user: User = Depends(get_current_user)
 ):
     """Get all documents for current user"""
-    documents = db.query(Document).filter(Document.owner_id == current_user.id).all()
+    documents = db.query(Document).options(defer(Document.extracted_text)).filter(
+        Document.owner_id == current_user.id
+    ).all()
     return documents
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get specific document"""
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == current_user.id
-    ).first()
-    
-    if not document:
+    version = _document_version(db, document_id, current_user.id)
+    if not version:
         raise HTTPException(status_code=404, detail="Document not found")
     
+    # Polling clients get a 304 without loading or serializing the document
+    etag = make_etag("document", *version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    document = db.query(Document).options(defer(Document.extracted_text)).filter(
+        Document.id == document_id
+    ).first()
+    
+    set_etag(response, etag)
     return document
 
 @router.get("/{document_id}/requirements", response_model=List[RequirementSchema])
 async def get_document_requirements(
     document_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get requirements for a specific document"""
     # Verify user owns the document
+    version = _document_version(db, document_id, current_user.id)
+    if not version:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    etag = make_etag("requirements", version.id, version.requirements_revision)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    requirements = db.query(ComplianceRequirement).filter(
+        ComplianceRequirement.document_id == document_id
+    ).all()
+    
+    set_etag(response, etag)
+    return requirements
+
+@router.post("/{document_id}/ask", response_model=AnswerResponse)
+async def ask_document(
+    document_id: int,
+    question: QuestionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Answer a question about a document from its most relevant passages"""
     document = db.query(Document).filter(
         Document.id == document_id,
         Document.owner_id == current_user.id
@@ -162,8 +342,39 @@ async def get_document_requirements(
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    requirements = db.query(ComplianceRequirement).filter(
-        ComplianceRequirement.document_id == document_id
-    ).all()
+    text = document.text
+    if not text:
+        raise HTTPException(status_code=400, detail="Document has no extracted text")
+    
+    if not question.question.strip():
+        raise HTTPException(status_code=400, detail="Question is empty")
+    
+    # Built once per distinct text and persisted; later questions only load it
+    index = await run_in_threadpool(get_chunk_index, db, text)
+    top_k = min(question.top_k or settings.qa_default_top_k, settings.qa_max_top_k)
+    
+    citations = []
+    for chunk, score in index.search(question.question, top_k):
+        start, end = index.spans[chunk]
+        citations.append(ChunkCitation(
+            chunk=chunk,
+            start=start,
+            end=end,
+            score=round(score, 4),
+            text=text[start:end]
+        ))
+    
+    if not citations:
+        return AnswerResponse(
+            answer="No passages in this document match the question.",
+            citations=[]
+        )
+    
+    with telemetry.trace(current_user.id, "question", document.document_type.value, document.id) as trace:
+        trace.text_chars = sum(len(c.text) for c in citations)
+        analyzer = AIAnalyzer()
+        with trace.stage("analysis"):
+            answer = await analyzer.answer_question(question.question, [c.text for c in citations])
+        trace.outcome = "fallback" if answer is None else "answered"
     
-    return requirements
\ No newline at end of file
+    return AnswerResponse(answer=answer, citations=citations, fallback=answer is None)
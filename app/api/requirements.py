@@ -0,0 +1,255 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, get_db
+from app.models.models import (
+    User, Document, ComplianceRequirement, DocumentType,
+    RequirementPriority, RequirementStatus
+)
+from app.models.schemas import RequirementListItem, RequirementPage, RequirementStatusUpdate
+from app.services.auth import get_current_user
+from app.services.compliance_scorer import compliance_scorer
+from app.services.compliance_history import compliance_history
+
+router = APIRouter()
+
+# Rows fetched per round trip; memory use is bounded by this, not by the export size
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    ("requirement_id", ComplianceRequirement.id),
+    ("document_id", Document.id),
+    ("document_filename", Document.filename),
+    ("document_type", Document.document_type),
+    ("document_created_at", Document.created_at),
+    ("requirement_text", ComplianceRequirement.requirement_text),
+    ("plain_english", ComplianceRequirement.plain_english),
+    ("category", ComplianceRequirement.category),
+    ("priority", ComplianceRequirement.priority),
+    ("status", ComplianceRequirement.status),
+    ("confidence_score", ComplianceRequirement.confidence_score),
+    ("source_section", ComplianceRequirement.source_section),
+    ("created_at", ComplianceRequirement.created_at),
+]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+# Dimensions counted in the facets of a requirements listing
+FACET_COLUMNS = {
+    "priority": ComplianceRequirement.priority,
+    "category": ComplianceRequirement.category,
+    "status": ComplianceRequirement.status,
+}
+
+def _facet_key(value) -> str:
+    """Facet bucket name for a grouped column value"""
+    if value is None:
+        return "uncategorized"
+    return value.value if hasattr(value, "value") else value
+
+def _export_value(value):
+    """Convert enum and datetime columns to plain values"""
+    if hasattr(value, "value"):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _export_batches(statement) -> Iterator[list]:
+    """Stream result rows in batches using a server-side cursor where supported"""
+    # The session outlives the request handler, so the generator owns it
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for batch in result.partitions():
+            yield batch
+    finally:
+        db.close()
+
+def _format_csv(batches: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for batch in batches:
+        writer.writerows([_export_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def _format_jsonl(batches: Iterator[list]) -> Iterator[bytes]:
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for batch in batches:
+        lines = [
+            json.dumps(dict(zip(names, (_export_value(value) for value in row))))
+            for row in batch
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+@router.get("/export")
+async def export_requirements(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|jsonl)$"),
+    document_id: Optional[int] = None,
+    document_type: Optional[DocumentType] = None,
+    priority: Optional[RequirementPriority] = None,
+    category: Optional[str] = None,
+    status: Optional[RequirementStatus] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    compress: bool = True,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream all of the current user's requirements with document metadata as CSV or JSONL"""
+    statement = select(*[column for _, column in EXPORT_COLUMNS]).join(
+        Document, ComplianceRequirement.document_id == Document.id
+    ).where(
+        Document.owner_id == current_user.id
+    ).order_by(ComplianceRequirement.id)
+
+    if document_id is not None:
+        statement = statement.where(Document.id == document_id)
+    if document_type is not None:
+        statement = statement.where(Document.document_type == document_type)
+    if priority is not None:
+        statement = statement.where(ComplianceRequirement.priority == priority)
+    if category is not None:
+        statement = statement.where(ComplianceRequirement.category == category)
+    if status is not None:
+        statement = statement.where(ComplianceRequirement.status == status)
+    if created_after is not None:
+        statement = statement.where(ComplianceRequirement.created_at >= created_after)
+    if created_before is not None:
+        statement = statement.where(ComplianceRequirement.created_at < created_before)
+
+    formatter = _format_csv if format == "csv" else _format_jsonl
+    body = formatter(_export_batches(statement))
+    headers = {"Content-Disposition": f'attachment; filename="requirements.{format}"'}
+
+    # Compress on the fly when the client accepts it
+    if compress and "gzip" in request.headers.get("accept-encoding", ""):
+        body = _gzip(body)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+@router.get("/", response_model=RequirementPage)
+async def list_requirements(
+    priority: Optional[List[RequirementPriority]] = Query(None),
+    category: Optional[List[str]] = Query(None),
+    status: Optional[List[RequirementStatus]] = Query(None),
+    document_type: Optional[List[DocumentType]] = Query(None),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    include_facets: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List the current user's requirements across all documents, newest first"""
+    # Filters per facet dimension, so each facet can be counted without its own filter
+    filters = {
+        "priority": ComplianceRequirement.priority.in_(priority) if priority else None,
+        "category": ComplianceRequirement.category.in_(category) if category else None,
+        "status": ComplianceRequirement.status.in_(status) if status else None,
+    }
+    common = [ComplianceRequirement.owner_id == current_user.id]
+    if document_type:
+        common.append(ComplianceRequirement.document_id.in_(
+            select(Document.id).where(
+                Document.owner_id == current_user.id,
+                Document.document_type.in_(document_type)
+            )
+        ))
+    if created_after is not None:
+        common.append(ComplianceRequirement.created_at >= created_after)
+    if created_before is not None:
+        common.append(ComplianceRequirement.created_at < created_before)
+
+    conditions = common + [condition for condition in filters.values() if condition is not None]
+
+    # Keyset pagination: seek past the cursor on the (owner_id, ..., id) indexes instead of OFFSET
+    query = db.query(ComplianceRequirement).filter(*conditions)
+    if cursor is not None:
+        query = query.filter(ComplianceRequirement.id < cursor)
+    rows = query.order_by(ComplianceRequirement.id.desc()).limit(limit + 1).all()
+
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+
+    facets = None
+    # Counts don't change from page to page; only the first page pays for the GROUP BYs
+    if include_facets and cursor is None:
+        facets = {}
+        for name, column in FACET_COLUMNS.items():
+            facet_conditions = common + [
+                condition for other, condition in filters.items()
+                if other != name and condition is not None
+            ]
+            counts = db.query(column, func.count()).filter(*facet_conditions).group_by(column).all()
+            facets[name] = {_facet_key(value): count for value, count in counts}
+
+    return RequirementPage(items=rows[:limit], next_cursor=next_cursor, facets=facets)
+
+@router.patch("/{requirement_id}", response_model=RequirementListItem)
+async def update_requirement_status(
+    requirement_id: int,
+    update: RequirementStatusUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Change a requirement's status and rescore its document"""
+    requirement = db.query(ComplianceRequirement).filter(
+        ComplianceRequirement.id == requirement_id,
+        ComplianceRequirement.owner_id == current_user.id
+    ).first()
+
+    if not requirement:
+        raise HTTPException(status_code=404, detail="Requirement not found")
+
+    if requirement.status != update.status:
+        completed = update.status == RequirementStatus.COMPLETED
+        reopened = requirement.status == RequirementStatus.COMPLETED
+        requirement.status = update.status
+        requirement.completed_at = datetime.utcnow() if completed else None
+        
+        old_score = db.query(Document.compliance_score).filter(Document.id == requirement.document_id).scalar()
+        db.query(Document).filter(Document.id == requirement.document_id).update(
+            {Document.requirements_revision: Document.requirements_revision + 1},
+            synchronize_session=False
+        )
+        db.flush()
+        new_score = compliance_scorer.rescore_document(db, requirement.document_id)
+        
+        compliance_history.record(
+            db, current_user.id,
+            requirements_completed=int(completed),
+            requirements_reopened=int(reopened),
+            score_delta=new_score - (old_score or 0)
+        )
+        db.commit()
+        db.refresh(requirement)
+
+    return requirement
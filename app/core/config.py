@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     app_name: str = "ComplianceAI"
@@ -9,12 +9,85 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     claude_api_key: Optional[str] = None
+    claude_base_url: Optional[str] = None  # Point at a fake server for fault-injection testing
+    upload_dir: str = "uploads"
+    
+    # Model routing: fast tier first, escalate low-confidence results
+    claude_fast_model: str = "claude-3-haiku-20240307"
+    claude_strong_model: str = "claude-3-5-sonnet-20241022"
+    escalation_min_confidence: float = 0.6  # Mean requirement confidence below this escalates
+    escalation_min_requirements: int = 2
+    strong_first_escalation_rate: float = 0.5  # Skip the fast tier for types that usually escalate
+    
+    # Coalescing of concurrent identical analyses
+    analysis_job_lease_seconds: float = 90.0  # A running job not finished by then is taken over
+    analysis_job_ttl_seconds: int = 600  # Finished results are reused this long
+    analysis_job_poll_seconds: float = 0.5  # How often other workers check a shared job
+    
+    # Document Q&A
+    qa_chunk_chars: int = 1200
+    qa_chunk_overlap_chars: int = 200
+    qa_default_top_k: int = 4
+    qa_max_top_k: int = 8
+    qa_max_tokens: int = 600
+    
+    # Deadlines and circuit breaking around the Claude API
+    request_deadline_seconds: float = 60.0  # End-to-end budget for a request
+    min_request_timeout_seconds: float = 10.0  # Shortest budget a client may ask for
+    claude_timeout_seconds: float = 30.0  # Cap for a single Claude call
+    claude_max_retries: int = 1
+    circuit_failure_threshold: int = 5  # Consecutive failures before failing fast
+    circuit_recovery_seconds: float = 30.0  # Wait before a half-open probe
+    
+    # Local compliance scoring: outstanding points against what was earned, out of 100
+    score_priority_points: Dict[str, float] = {"critical": 12.0, "high": 6.0, "medium": 3.0, "low": 1.0}
+    score_category_multipliers: Dict[str, float] = {
+        "data_protection": 1.25, "security": 1.25, "user_rights": 1.0, "legal": 1.0, "operational": 0.75
+    }
+    score_default_category_multiplier: float = 1.0  # Categories missing from the table
+    score_status_credit: Dict[str, float] = {"pending": 0.0, "in_progress": 0.5, "completed": 1.0}  # Share of points earned back
+    score_default_confidence: float = 0.7  # Weights scale with confidence; used when it wasn't recorded
+    score_half_points: float = 24.0  # Outstanding points at which a document scores 50
+    
+    # Local obligation extraction, used when Claude is unavailable or over budget
+    extractor_max_requirements: int = 100  # Highest priorities are kept beyond this
+    extractor_pool_workers: int = 2  # Processes for large documents; 0 extracts in a thread
+    extractor_pool_min_chars: int = 50000  # Smaller documents are extracted in a thread
+    
+    # Per-analysis telemetry and cost attribution
+    telemetry_enabled: bool = True
+    telemetry_flush_seconds: float = 5.0  # Buffered rows are batch-inserted this often
+    telemetry_max_buffer: int = 10000  # Oldest unflushed rows are dropped beyond this
+    telemetry_retention_days: int = 90  # Raw rows; daily buckets are kept
+    model_input_cost_per_million: Dict[str, float] = {
+        "claude-3-haiku-20240307": 0.25, "claude-3-5-sonnet-20241022": 3.0
+    }  # USD per million input tokens
+    model_output_cost_per_million: Dict[str, float] = {
+        "claude-3-haiku-20240307": 1.25, "claude-3-5-sonnet-20241022": 15.0
+    }  # USD per million output tokens
     
     # Token usage limits
     max_tokens_per_request: int = 2000
     max_daily_requests: int = 50  # Conservative limit for $5 budget
     daily_token_limit: int = 100000  # Estimated tokens per day for $5 budget
     
+    # Per-user rate limiting and admission control on expensive endpoints
+    rate_limit_requests: int = 10  # Requests per user per sliding window
+    rate_limit_window_seconds: int = 60
+    max_concurrent_uploads_per_user: int = 2
+    max_concurrent_uploads_global: int = 20
+    upload_slot_lease_seconds: int = 300  # Reclaim slots left behind by crashed workers
+    admission_retry_after_seconds: int = 5
+    
+    # Storage lifecycle (uploads/ and usage history retention)
+    storage_lifecycle_enabled: bool = True
+    storage_lifecycle_interval_seconds: int = 3600
+    storage_lifecycle_batch_size: int = 200  # Max items handled per step per run
+    orphan_upload_grace_hours: int = 24  # Don't touch files younger than this
+    failed_upload_retention_days: int = 7
+    compress_uploads_after_days: int = 30
+    usage_history_retention_days: int = 90  # Older daily entries roll up into months
+    
     class Config:
         env_file = ".env"
 
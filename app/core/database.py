@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict
+from sqlalchemy import create_engine, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
@@ -15,6 +17,25 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create Base class
 Base = declarative_base()
 
+def add_to_counters(db, model, key: Dict[str, Any], amounts: Dict[str, Any]):
+    """Atomically add amounts to the counters of the row with this key, creating it if needed, in the caller's transaction"""
+    stmt = update(model).where(
+        *[getattr(model, name) == value for name, value in key.items()]
+    ).values({
+        getattr(model, name): getattr(model, name) + amount
+        for name, amount in amounts.items()
+    })
+
+    if db.execute(stmt).rowcount:
+        return
+
+    try:
+        with db.begin_nested():
+            db.add(model(**key, **amounts))
+    except IntegrityError:
+        # Another worker created the row first
+        db.execute(stmt)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
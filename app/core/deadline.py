@@ -0,0 +1,50 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from app.core.config import settings
+
+class Deadline:
+    """End-to-end time budget shared by every stage of a request"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cap(self, seconds: float) -> float:
+        """Limit a stage's own timeout to what is left of the budget"""
+        return min(seconds, self.remaining())
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+def get_deadline() -> Deadline:
+    """Deadline of the current request, or a fresh default budget outside one"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        deadline = Deadline(settings.request_deadline_seconds)
+    return deadline
+
+class DeadlineMiddleware(BaseHTTPMiddleware):
+    """Attach a deadline to each request; clients may ask for a shorter one via X-Request-Timeout"""
+
+    async def dispatch(self, request: Request, call_next):
+        budget = settings.request_deadline_seconds
+        try:
+            requested = float(request.headers.get("x-request-timeout", budget))
+            if requested > 0:
+                budget = min(budget, max(requested, settings.min_request_timeout_seconds))
+        except ValueError:
+            pass
+
+        token = _current_deadline.set(Deadline(budget))
+        try:
+            return await call_next(request)
+        finally:
+            _current_deadline.reset(token)
@@ -0,0 +1,28 @@
+import hashlib
+from fastapi import Request, Response
+
+# Clients may keep responses but must revalidate them with If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts) -> str:
+    """Weak ETag from cheap version stamps of the underlying rows"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already covers this version"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes don't matter for GET revalidation
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
@@ -1,31 +1,88 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
 from app.core.database import engine
+from app.core.deadline import DeadlineMiddleware
 from app.models.models import Base
-from app.api import auth, documents, dashboard
+from app.api import auth, documents, dashboard, requirements
+from app.services.rate_limiter import RateLimitMiddleware
+from app.services.ai_analyzer import get_claude_client, claude_breaker
+from app.services.storage_lifecycle import storage_lifecycle
+from app.services.obligation_extractor import obligation_extractor
+from app.services.telemetry import telemetry
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+def _warm_up_claude_client():
+    """Import the SDK and build the shared client ahead of the first upload"""
+    if not settings.claude_api_key:
+        return
+    try:
+        get_claude_client()
+    except Exception as e:
+        print(f"Claude client warm-up failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup work, kept out of module import so importing the app stays cheap"""
+    # Create database tables and open the first pooled connection
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    
+    # Warm the Claude client without delaying the first response
+    warm_up = asyncio.create_task(run_in_threadpool(_warm_up_claude_client))
+    
+    background_tasks = []
+    if settings.storage_lifecycle_enabled:
+        background_tasks.append(asyncio.create_task(storage_lifecycle.run_forever()))
+    if settings.telemetry_enabled:
+        background_tasks.append(asyncio.create_task(telemetry.run_forever()))
+    
+    yield
+    
+    for task in background_tasks:
+        task.cancel()
+    # Let the telemetry task write out what is still buffered
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    obligation_extractor.shutdown()
+    await warm_up
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="AI-powered compliance document analysis tool",
     version="1.0.0",
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan
 )
 
-# Add CORS middleware
+# Compress larger JSON responses such as requirement lists
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
+# Per-user rate limiting and admission control on expensive endpoints
+app.add_middleware(RateLimitMiddleware)
+
+# End-to-end deadline budget for each request
+app.add_middleware(DeadlineMiddleware)
+
+# Add CORS middleware last so it wraps everything, including 429/503 responses
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Configure this properly for production
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
 # Mount static files
@@ -38,6 +95,7 @@ templates = Jinja2Templates(directory="app/templates")
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(documents.router, prefix="/api/documents", tags=["Documents"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
+app.include_router(requirements.router, prefix="/api/requirements", tags=["Requirements"])
 
 # Root endpoint
 @app.get("/")
@@ -47,7 +105,13 @@ async def root(request: Request):
 # Health check
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "app": settings.app_name}
+    claude = claude_breaker.snapshot()
+    return {
+        # Still serving (with fallback analyses) while the Claude circuit is open
+        "status": "degraded" if claude["state"] == "open" else "healthy",
+        "app": settings.app_name,
+        "claude": claude
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, Enum
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Float, Enum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -27,6 +27,11 @@ class RequirementPriority(enum.Enum):
     MEDIUM = "medium"
     LOW = "low"
 
+class JobStatus(enum.Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 class RequirementStatus(enum.Enum):
     PENDING = "pending"
     IN_PROGRESS = "in_progress"
@@ -58,20 +63,41 @@ class Document(Base):
     file_size = Column(Integer)
     extracted_text = Column(Text)
     summary = Column(Text)
-    compliance_score = Column(Integer)  # 0-100
+    compliance_score = Column(Integer)  # 0-100, computed locally from the requirements
+    model_compliance_score = Column(Integer)  # 0-100 as returned by the analysis model
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     processed_at = Column(DateTime(timezone=True))
+    source_url = Column(String)  # Normalized URL for documents submitted as web pages
+    analysis_model = Column(String)  # Model that produced the stored analysis
+    requirements_revision = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped on any requirement change
     
     # Foreign keys
     owner_id = Column(Integer, ForeignKey("users.id"))
+    shared_analysis_id = Column(Integer, ForeignKey("shared_analyses.id"), index=True)
     
     # Relationships
     owner = relationship("User", back_populates="documents")
     requirements = relationship("ComplianceRequirement", back_populates="document")
+    shared_analysis = relationship("SharedAnalysis", back_populates="documents")
+    
+    @property
+    def text(self):
+        """Extracted text, read from the shared analysis for web pages"""
+        if self.extracted_text is None and self.shared_analysis is not None:
+            return self.shared_analysis.extracted_text
+        return self.extracted_text
 
 # Compliance Requirement model
 class ComplianceRequirement(Base):
     __tablename__ = "compliance_requirements"
+    # Owner-scoped filters paginated by id (keyset) for the cross-document requirements API
+    __table_args__ = (
+        Index("ix_requirements_owner_id", "owner_id", "id"),
+        Index("ix_requirements_owner_status_priority", "owner_id", "status", "priority", "id"),
+        Index("ix_requirements_owner_priority", "owner_id", "priority", "id"),
+        Index("ix_requirements_owner_category", "owner_id", "category", "id"),
+        Index("ix_requirements_owner_created", "owner_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     requirement_text = Column(Text, nullable=False)
@@ -82,9 +108,129 @@ class ComplianceRequirement(Base):
     confidence_score = Column(Float)  # 0.0-1.0
     source_section = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True))  # Set while the status is completed
     
     # Foreign keys
-    document_id = Column(Integer, ForeignKey("documents.id"))
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))  # Denormalized from the document for owner-scoped queries
+    
+    # Relationships
+    document = relationship("Document", back_populates="requirements")
+
+# Analysis of a public web page, shared by every user who submits the same content
+class SharedAnalysis(Base):
+    __tablename__ = "shared_analyses"
+    __table_args__ = (UniqueConstraint("url_key", "content_hash"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    url_key = Column(String, nullable=False)  # Normalized URL
+    content_hash = Column(String(64), nullable=False)  # SHA-256 of normalized page text
+    extracted_text = Column(Text)
+    analysis_json = Column(Text, nullable=False)  # Serialized AnalysisResult
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    document = relationship("Document", back_populates="requirements")
\ No newline at end of file
+    documents = relationship("Document", back_populates="shared_analysis")
+
+# BM25 chunk index over a document's text, shared by documents with identical text
+class ChunkIndex(Base):
+    __tablename__ = "chunk_indexes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    text_hash = Column(String(64), unique=True, index=True, nullable=False)  # SHA-256 of the indexed text
+    index_json = Column(Text, nullable=False)  # Serialized BM25Index
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# In-flight or recently finished analysis, shared by identical concurrent requests across workers
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True, nullable=False)  # Content hash and document type
+    status = Column(Enum(JobStatus), nullable=False)
+    result_json = Column(Text)  # Serialized AnalysisResult
+    error = Column(Text)
+    lease_expires_at = Column(Float, nullable=False)  # Epoch seconds; running jobs past this are abandoned
+    updated_at = Column(Float, nullable=False)  # Epoch seconds
+
+# Sliding-window rate limit counter (shared across workers)
+class RateLimitCounter(Base):
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String, primary_key=True)
+    window_start = Column(Integer, primary_key=True)  # Epoch seconds
+    count = Column(Integer, nullable=False, default=0)
+
+# In-flight request slot for concurrency caps (shared across workers)
+class InflightSlot(Base):
+    __tablename__ = "inflight_slots"
+
+    id = Column(String, primary_key=True)
+    key = Column(String, index=True, nullable=False)
+    expires_at = Column(Float, index=True, nullable=False)  # Epoch seconds
+
+# Lease on a periodic background job, so only one worker runs it at a time
+class JobLease(Base):
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)  # Worker that holds the lease
+    expires_at = Column(Float, nullable=False)  # Epoch seconds
+
+# One analysis or question: who asked, what it cost and where the time went
+class AnalysisTelemetry(Base):
+    __tablename__ = "analysis_telemetry"
+    __table_args__ = (Index("ix_analysis_telemetry_user_created", "user_id", "created_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"))
+    operation = Column(String, nullable=False)  # analysis or question
+    document_type = Column(String, nullable=False)
+    model = Column(String, nullable=False)  # Model that produced the result, or "local"
+    outcome = Column(String, nullable=False)  # analyzed, coalesced, shared_cache, fallback, answered, failed, timeout
+    claude_calls = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    file_size = Column(Integer)
+    text_chars = Column(Integer)
+    extract_ms = Column(Float)
+    analysis_ms = Column(Float)
+    claude_ms = Column(Float)
+    save_ms = Column(Float)
+    total_ms = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False)  # UTC
+
+# Telemetry summed per day and dimension, so usage queries never scan raw rows
+class UsageDailyBucket(Base):
+    __tablename__ = "usage_daily_buckets"
+
+    day = Column(Date, primary_key=True)  # UTC
+    user_id = Column(Integer, primary_key=True)
+    operation = Column(String, primary_key=True)
+    document_type = Column(String, primary_key=True)
+    model = Column(String, primary_key=True)
+    outcome = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    claude_calls = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    text_chars = Column(Integer, nullable=False, default=0)
+    claude_ms = Column(Float, nullable=False, default=0.0)
+    total_ms = Column(Float, nullable=False, default=0.0)
+
+# Per-user daily compliance activity, maintained as documents complete and requirements change
+class ComplianceDailyBucket(Base):
+    __tablename__ = "compliance_daily_buckets"
+
+    user_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC
+    documents_completed = Column(Integer, nullable=False, default=0)
+    completed_score_sum = Column(Integer, nullable=False, default=0)  # Scores of the documents completed that day
+    score_delta = Column(Integer, nullable=False, default=0)  # Change in the sum of all the user's document scores
+    requirements_opened = Column(Integer, nullable=False, default=0)
+    requirements_completed = Column(Integer, nullable=False, default=0)
+    requirements_reopened = Column(Integer, nullable=False, default=0)
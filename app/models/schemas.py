@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Dict
 from datetime import datetime
 from .models import DocumentType, DocumentStatus, RequirementPriority, RequirementStatus
 
@@ -26,14 +26,23 @@ class DocumentBase(BaseModel):
 class DocumentCreate(DocumentBase):
     pass
 
+class UrlDocumentCreate(BaseModel):
+    url: str
+    content: str
+    title: Optional[str] = None
+    document_type: DocumentType = DocumentType.TERMS
+
 class DocumentResponse(DocumentBase):
     id: int
     status: DocumentStatus
     file_size: Optional[int] = None
     summary: Optional[str] = None
     compliance_score: Optional[int] = None
+    model_compliance_score: Optional[int] = None
     created_at: datetime
     processed_at: Optional[datetime] = None
+    source_url: Optional[str] = None
+    analysis_model: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -44,6 +53,8 @@ class RequirementBase(BaseModel):
     plain_english: str
     category: Optional[str] = None
     priority: RequirementPriority = RequirementPriority.MEDIUM
+    confidence_score: Optional[float] = None
+    source_section: Optional[str] = None
 
 class RequirementCreate(RequirementBase):
     document_id: int
@@ -51,18 +62,46 @@ class RequirementCreate(RequirementBase):
 class ComplianceRequirement(RequirementBase):
     id: int
     status: RequirementStatus
-    confidence_score: Optional[float] = None
-    source_section: Optional[str] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class RequirementListItem(ComplianceRequirement):
+    document_id: int
+
+class RequirementStatusUpdate(BaseModel):
+    status: RequirementStatus
+
+class RequirementPage(BaseModel):
+    items: List[RequirementListItem]
+    next_cursor: Optional[int] = None  # Pass as cursor to fetch the next page
+    facets: Optional[Dict[str, Dict[str, int]]] = None  # Counts per priority, category and status
+
 # Analysis Response Schema
 class AnalysisResult(BaseModel):
     summary: str
     compliance_score: int
     requirements: List[RequirementBase]
+    fallback: bool = False  # True when produced without the model
+    model: Optional[str] = None
+    
+# Document Q&A Schemas
+class QuestionRequest(BaseModel):
+    question: str
+    top_k: Optional[int] = Field(default=None, ge=1)
+
+class ChunkCitation(BaseModel):
+    chunk: int
+    start: int
+    end: int
+    score: float
+    text: str
+
+class AnswerResponse(BaseModel):
+    answer: Optional[str] = None
+    citations: List[ChunkCitation]
+    fallback: bool = False  # True when only the relevant passages could be returned
     
 # Token Schemas
 class Token(BaseModel):
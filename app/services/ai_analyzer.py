@@ -1,80 +1,222 @@
-import anthropic
-from typing import List, Dict, Any
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from pydantic import ValidationError
 from app.core.config import settings
-from app.models.schemas import AnalysisResult, RequirementBase
-from app.models.models import RequirementPriority
+from app.core.deadline import get_deadline
+from app.models.schemas import AnalysisResult
 from app.services.usage_tracker import usage_tracker
-import json
-import re
+from app.services.model_router import model_router
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.obligation_extractor import obligation_extractor
+from app.services.telemetry import current_trace
+from app.services.analysis_format import (
+    ANALYSIS_TOOL, ANALYSIS_TOOL_NAME, segment_text, number_segments, expand_analysis
+)
+
+_client = None
+
+# Trips after repeated Claude failures so uploads fall back immediately
+claude_breaker = CircuitBreaker(
+    "claude",
+    failure_threshold=settings.circuit_failure_threshold,
+    recovery_seconds=settings.circuit_recovery_seconds
+)
+
+def get_claude_client():
+    """Shared Claude client; the SDK is imported and connected on first use"""
+    global _client
+    if _client is None:
+        if not settings.claude_api_key:
+            raise ValueError("Claude API key not configured")
+        import anthropic
+        _client = anthropic.AsyncAnthropic(
+            api_key=settings.claude_api_key,
+            base_url=settings.claude_base_url,
+            max_retries=settings.claude_max_retries
+        )
+    return _client
 
 class AIAnalyzer:
     """Simple AI analyzer using Claude API for document compliance analysis"""
     
     def __init__(self):
-        if not settings.claude_api_key:
-            raise ValueError("Claude API key not configured")
-        self.client = anthropic.Anthropic(api_key=settings.claude_api_key)
+        # Without an API key, analyses run offline through the local extractor
+        self.client = get_claude_client() if settings.claude_api_key else None
     
     async def analyze_document(self, text: str, document_type: str) -> AnalysisResult:
         """Analyze document for compliance requirements"""
+        if self.client is None:
+            return await obligation_extractor.analyze(text)
         
         # Check usage limits before making API call
         can_proceed, reason = usage_tracker.can_make_request()
         if not can_proceed:
             print(f"API usage limit reached: {reason}")
-            return self._create_fallback_analysis(text, document_type)
+            return await obligation_extractor.analyze(text)
+        
+        # Truncate text to avoid token limits
+        truncated_text = text[:4000] if len(text) > 4000 else text
+        spans = segment_text(truncated_text)
         
         # Create prompt based on document type
-        prompt = self._create_analysis_prompt(text, document_type)
+        prompt = self._create_analysis_prompt(truncated_text, spans, document_type)
         
-        try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",  # Using cost-effective model for MVP
-                max_tokens=settings.max_tokens_per_request,
-                temperature=0.3,
+        # Run the fast tier first and escalate only when its result is weak
+        models = model_router.plan(document_type)
+        best_result = None
+        
+        for index, model in enumerate(models):
+            if index > 0:
+                can_proceed, reason = usage_tracker.can_make_request()
+                if not can_proceed:
+                    print(f"Skipping escalation to {model}: {reason}")
+                    break
+            
+            response = await self._create_message(
+                model=model,
                 system="You are a compliance expert. Analyze documents for regulatory requirements and provide clear, actionable guidance.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+                prompt=prompt,
+                max_tokens=settings.max_tokens_per_request,
+                tool=ANALYSIS_TOOL
             )
+            if response is None:
+                break
             
-            # Record usage
-            tokens_used = response.usage.input_tokens + response.usage.output_tokens
-            usage_tracker.record_usage(tokens_used)
-            
-            result_text = response.content[0].text
-            return self._parse_analysis_result(result_text)
+            result = self._parse_analysis_result(response, truncated_text, spans)
+            result.model = model
+            if not result.fallback:
+                best_result = result
             
+            reason = model_router.escalation_reason(result)
+            if model == settings.claude_fast_model:
+                model_router.record(document_type, escalated=reason is not None)
+            if reason is None:
+                break
+            if index + 1 < len(models):
+                print(f"Escalating analysis from {model}: {reason}")
+        
+        if best_result is None:
+            # Extract obligations locally if Claude API fails
+            return await obligation_extractor.analyze(text)
+        return best_result
+    
+    async def answer_question(self, question: str, excerpts: List[str]) -> Optional[str]:
+        """Answer a question from numbered document excerpts; None if Claude is unavailable"""
+        can_proceed, reason = usage_tracker.can_make_request()
+        if not can_proceed:
+            print(f"API usage limit reached: {reason}")
+            return None
+        
+        numbered = "\n\n".join(f"[{number}] {excerpt}" for number, excerpt in enumerate(excerpts, 1))
+        prompt = f"""
+        Answer the question using only the numbered excerpts from a compliance document below.
+        Cite the excerpts you rely on by number, like [1] or [2][3].
+        If the excerpts don't contain the answer, say so.
+
+        Excerpts:
+        {numbered}
+
+        Question: {question}
+        """
+        
+        response = await self._create_message(
+            model=settings.claude_fast_model,
+            system="You are a compliance expert. Answer questions about documents accurately and concisely.",
+            prompt=prompt,
+            max_tokens=settings.qa_max_tokens
+        )
+        if response is None:
+            return None
+        return response.content[0].text.strip()
+    
+    async def _create_message(self, model: str, system: str, prompt: str, max_tokens: int, tool: Optional[dict] = None):
+        """Call Claude within the circuit breaker and request deadline; None if unavailable"""
+        if self.client is None:
+            return None
+        
+        # Checked before the breaker so an expired request never takes the half-open probe
+        if get_deadline().expired:
+            print("Request deadline exceeded before Claude call")
+            return None
+        
+        # Fail fast while the API is unhealthy instead of waiting out timeouts
+        if not claude_breaker.allow_request():
+            print("Claude circuit open, skipping API call")
+            return None
+        
+        timeout = get_deadline().cap(settings.claude_timeout_seconds)
+        if timeout <= 0:
+            # Expired between the two checks
+            claude_breaker.release_probe()
+            print("Request deadline exceeded before Claude call")
+            return None
+        
+        # Force structured output through the tool's schema when one is given
+        tool_options = {}
+        if tool:
+            tool_options = {"tools": [tool], "tool_choice": {"type": "tool", "name": tool["name"]}}
+        
+        started = time.perf_counter()
+        try:
+            # wait_for also bounds SDK retries by the remaining budget
+            response = await asyncio.wait_for(
+                self.client.messages.create(
+                    model=model,
+                    max_tokens=max_tokens,
+                    temperature=0.3,
+                    system=system,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    timeout=timeout,
+                    **tool_options
+                ),
+                timeout=timeout
+            )
         except Exception as e:
-            print(f"Claude API error: {e}")
-            # Fallback analysis if Claude API fails
-            return self._create_fallback_analysis(text, document_type)
+            import anthropic
+            timed_out = isinstance(e, (asyncio.TimeoutError, anthropic.APITimeoutError))
+            if timed_out and timeout < settings.claude_timeout_seconds:
+                # Cut short by the request's own deadline: says nothing about the API's health
+                claude_breaker.release_probe()
+                print(f"Claude call stopped at the request deadline after {timeout:.1f}s")
+            else:
+                claude_breaker.record_failure()
+                print(f"Claude API error: {e!r}")
+            return None
+        claude_breaker.record_success()
+        
+        # Record usage, globally for the budget and on the request's trace for attribution
+        tokens_used = response.usage.input_tokens + response.usage.output_tokens
+        usage_tracker.record_usage(tokens_used)
+        trace = current_trace()
+        if trace is not None:
+            trace.add_call(
+                model, response.usage.input_tokens, response.usage.output_tokens,
+                (time.perf_counter() - started) * 1000
+            )
+        return response
     
-    def _create_analysis_prompt(self, text: str, document_type: str) -> str:
+    def _create_analysis_prompt(self, text: str, spans: List[Tuple[int, int]], document_type: str) -> str:
         """Create analysis prompt based on document type"""
         
-        # Truncate text to avoid token limits
-        truncated_text = text[:4000] if len(text) > 4000 else text
-        
         prompt = f"""
-        Analyze this {document_type} document for compliance requirements. 
+        Analyze this {document_type} document for compliance requirements.
+        The text is split into numbered segments.
 
         Document text:
-        {truncated_text}
+        {number_segments(text, spans)}
 
-        Please provide your analysis in the following JSON format:
-        {{
-            "summary": "Brief 2-3 sentence summary of the document",
-            "compliance_score": 75,
-            "requirements": [
-                {{
-                    "requirement_text": "Original requirement from document",
-                    "plain_english": "Simple explanation of what this means",
-                    "category": "data_protection",
-                    "priority": "high"
-                }}
-            ]
-        }}
+        Record your analysis with the {ANALYSIS_TOOL_NAME} tool:
+        - s: brief 2-3 sentence summary of the document
+        - sc: compliance score, 0-100
+        - r: one entry per requirement, with
+          - p: simple explanation of what it means
+          - c: category code - D data_protection, S security, L legal, O operational, U user_rights
+          - pr: priority code - C critical, H high, M medium, L low
+          - g: [first, last] segment numbers the requirement comes from
+          - cf: confidence 0.0-1.0 that this is a real obligation stated in the text
 
         Focus on:
         - Legal obligations and requirements
@@ -83,69 +225,20 @@ class AIAnalyzer:
         - User rights and responsibilities
         - Security requirements
 
-        Priority levels: critical, high, medium, low
-        Categories: data_protection, security, legal, operational, user_rights
-
-        Respond only with valid JSON.
+        Cite segments by number instead of quoting the text.
         """
         
         return prompt
     
-    def _parse_analysis_result(self, result_text: str) -> AnalysisResult:
-        """Parse AI response into structured result"""
+    def _parse_analysis_result(self, response, text: str, spans: List[Tuple[int, int]]) -> AnalysisResult:
+        """Validate the tool call in the response and expand it into a structured result"""
         try:
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                data = json.loads(json_str)
-            else:
-                data = json.loads(result_text)
-            
-            # Parse requirements
-            requirements = []
-            for req in data.get('requirements', []):
-                priority_str = req.get('priority', 'medium').upper()
-                try:
-                    priority = RequirementPriority(priority_str.lower())
-                except ValueError:
-                    priority = RequirementPriority.MEDIUM
-                
-                requirements.append(RequirementBase(
-                    requirement_text=req.get('requirement_text', ''),
-                    plain_english=req.get('plain_english', ''),
-                    category=req.get('category', 'general'),
-                    priority=priority
-                ))
-            
-            return AnalysisResult(
-                summary=data.get('summary', 'Document analyzed successfully'),
-                compliance_score=data.get('compliance_score', 50),
-                requirements=requirements
-            )
-            
-        except Exception as e:
-            # Return fallback if parsing fails
-            return self._create_fallback_analysis("", "")
-    
-    def _create_fallback_analysis(self, text: str, document_type: str) -> AnalysisResult:
-        """Create basic analysis if Claude API fails"""
-        word_count = len(text.split())
-        
-        # Simple heuristic scoring
-        score = min(max(30 + (word_count // 100), 30), 70)
-        
-        fallback_requirements = [
-            RequirementBase(
-                requirement_text="Review document for compliance requirements manually",
-                plain_english="This document needs manual review by a compliance expert",
-                category="manual_review",
-                priority=RequirementPriority.MEDIUM
+            tool_input = next(
+                block.input for block in response.content
+                if block.type == "tool_use" and block.name == ANALYSIS_TOOL_NAME
             )
-        ]
-        
-        return AnalysisResult(
-            summary=f"Document uploaded and processed. Contains approximately {word_count} words.",
-            compliance_score=score,
-            requirements=fallback_requirements
-        )
\ No newline at end of file
+            return expand_analysis(tool_input, text, spans)
+        except (StopIteration, ValidationError) as e:
+            print(f"Invalid analysis response: {e}")
+            # Marks the tier as failed so it escalates; never saved
+            return AnalysisResult(summary="", compliance_score=0, requirements=[], fallback=True)
@@ -0,0 +1,116 @@
+import re
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from pydantic import BaseModel, Field
+from app.models.models import RequirementPriority
+from app.models.schemas import AnalysisResult, RequirementBase
+
+# Compact wire codes; the model emits one letter instead of the full name
+PRIORITY_CODES = {
+    "C": RequirementPriority.CRITICAL,
+    "H": RequirementPriority.HIGH,
+    "M": RequirementPriority.MEDIUM,
+    "L": RequirementPriority.LOW,
+}
+
+CATEGORY_CODES = {
+    "D": "data_protection",
+    "S": "security",
+    "L": "legal",
+    "O": "operational",
+    "U": "user_rights",
+}
+
+# Sentence ends, or line breaks between blocks of text
+SEGMENT_BOUNDARY = re.compile(r"(?<=[.!?;:])\s+|\n\s*")
+
+ANALYSIS_TOOL_NAME = "record_analysis"
+
+ANALYSIS_TOOL = {
+    "name": ANALYSIS_TOOL_NAME,
+    "description": "Record the compliance analysis of the document.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "s": {"type": "string", "description": "Summary, 2-3 sentences"},
+            "sc": {"type": "integer", "minimum": 0, "maximum": 100, "description": "Compliance score"},
+            "r": {
+                "type": "array",
+                "description": "Requirements",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "p": {"type": "string", "description": "Plain-English explanation"},
+                        "c": {"type": "string", "enum": list(CATEGORY_CODES), "description": "Category code"},
+                        "pr": {"type": "string", "enum": list(PRIORITY_CODES), "description": "Priority code"},
+                        "g": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "minItems": 1,
+                            "maxItems": 2,
+                            "description": "First and last segment number of the source text"
+                        },
+                        "cf": {"type": "number", "minimum": 0, "maximum": 1, "description": "Confidence"}
+                    },
+                    "required": ["p", "c", "pr", "g"]
+                }
+            }
+        },
+        "required": ["s", "sc", "r"]
+    }
+}
+
+class CompactRequirement(BaseModel):
+    p: str
+    c: Literal["D", "S", "L", "O", "U"]
+    pr: Literal["C", "H", "M", "L"]
+    g: List[int] = Field(min_length=1, max_length=2)
+    cf: Optional[float] = Field(default=None, ge=0, le=1)
+
+class CompactAnalysis(BaseModel):
+    s: str
+    sc: int = Field(ge=0, le=100)
+    r: List[CompactRequirement]
+
+def segment_text(text: str) -> List[Tuple[int, int]]:
+    """(start, end) character offsets of the sentences in text"""
+    spans = []
+    start = 0
+    for boundary in SEGMENT_BOUNDARY.finditer(text):
+        if boundary.start() > start:
+            spans.append((start, boundary.start()))
+        start = boundary.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+def number_segments(text: str, spans: List[Tuple[int, int]]) -> str:
+    """Text with each segment prefixed by its number, for the model to cite"""
+    return "\n".join(f"[{number}] {text[start:end]}" for number, (start, end) in enumerate(spans))
+
+def expand_analysis(data: Dict[str, Any], text: str, spans: List[Tuple[int, int]]) -> AnalysisResult:
+    """
+    Validate a compact tool response and expand it into the full result
+    Raises: pydantic.ValidationError if the response doesn't match the schema
+    """
+    compact = CompactAnalysis.model_validate(data)
+
+    requirements = []
+    for req in compact.r:
+        # Segment numbers become character offsets into the extracted text
+        first = min(max(req.g[0], 0), len(spans) - 1) if spans else 0
+        last = min(max(req.g[-1], first), len(spans) - 1) if spans else 0
+        source_text = text[spans[first][0]:spans[last][1]] if spans else ""
+
+        requirements.append(RequirementBase(
+            requirement_text=source_text,
+            plain_english=req.p,
+            category=CATEGORY_CODES[req.c],
+            priority=PRIORITY_CODES[req.pr],
+            confidence_score=req.cf
+        ))
+
+    return AnalysisResult(
+        summary=compact.s,
+        compliance_score=compact.sc,
+        requirements=requirements
+    )
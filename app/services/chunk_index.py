@@ -0,0 +1,131 @@
+import hashlib
+import json
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import ChunkIndex
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in",
+    "is", "it", "of", "on", "or", "that", "the", "this", "to", "was", "what",
+    "when", "where", "which", "who", "will", "with", "do", "does", "we", "you",
+}
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+# Parsed indexes kept in memory so repeated questions skip deserialization
+CACHE_SIZE = 32
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def split_chunks(text: str, chunk_chars: int, overlap_chars: int) -> List[Tuple[int, int]]:
+    """Overlapping (start, end) windows, ending on sentence or word boundaries where possible"""
+    spans = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            window = text[start:end]
+            boundary = max(window.rfind(". "), window.rfind("\n"))
+            if boundary < chunk_chars // 2:
+                boundary = window.rfind(" ")
+            if boundary > chunk_chars // 2:
+                end = start + boundary + 1
+        spans.append((start, end))
+        if end >= len(text):
+            break
+        next_start = max(end - overlap_chars, start + 1)
+        # Begin the overlap on a word boundary
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return spans
+
+class BM25Index:
+    """BM25 ranking over fixed-size chunks of a document's text"""
+
+    def __init__(self, spans: List[List[int]], term_freqs: List[Dict[str, int]], doc_freqs: Dict[str, int]):
+        self.spans = spans
+        self.term_freqs = term_freqs
+        self.doc_freqs = doc_freqs
+        self.lengths = [sum(freqs.values()) for freqs in term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    @classmethod
+    def build(cls, text: str) -> "BM25Index":
+        spans = split_chunks(text, settings.qa_chunk_chars, settings.qa_chunk_overlap_chars)
+        term_freqs = [dict(Counter(tokenize(text[start:end]))) for start, end in spans]
+        doc_freqs = Counter(term for freqs in term_freqs for term in freqs)
+        return cls([list(span) for span in spans], term_freqs, dict(doc_freqs))
+
+    def to_json(self) -> str:
+        return json.dumps({"spans": self.spans, "term_freqs": self.term_freqs, "doc_freqs": self.doc_freqs})
+
+    @classmethod
+    def from_json(cls, data: str) -> "BM25Index":
+        parsed = json.loads(data)
+        return cls(parsed["spans"], parsed["term_freqs"], parsed["doc_freqs"])
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """(chunk number, score) of the best-matching chunks"""
+        terms = set(tokenize(query))
+        total = len(self.spans)
+        scores = []
+
+        for chunk, freqs in enumerate(self.term_freqs):
+            score = 0.0
+            norm = K1 * (1 - B + B * self.lengths[chunk] / self.avg_length) if self.avg_length else K1
+            for term in terms:
+                tf = freqs.get(term)
+                if not tf:
+                    continue
+                df = self.doc_freqs[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((chunk, score))
+
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:top_k]
+
+_cache: "OrderedDict[str, BM25Index]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def get_chunk_index(db: Session, text: str) -> BM25Index:
+    """Load the persisted index for this text, building and storing it on first use"""
+    digest = text_hash(text)
+
+    with _cache_lock:
+        if digest in _cache:
+            _cache.move_to_end(digest)
+            return _cache[digest]
+
+    stored = db.query(ChunkIndex).filter(ChunkIndex.text_hash == digest).first()
+    if stored:
+        index = BM25Index.from_json(stored.index_json)
+    else:
+        index = BM25Index.build(text)
+        db.add(ChunkIndex(text_hash=digest, index_json=index.to_json()))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Built concurrently by another request; both copies are identical
+            db.rollback()
+
+    with _cache_lock:
+        _cache[digest] = index
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
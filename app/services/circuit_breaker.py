@@ -0,0 +1,75 @@
+import threading
+import time
+from typing import Any, Dict
+
+class CircuitBreaker:
+    """
+    Fail fast while an upstream is unhealthy
+    closed: calls pass; open: calls rejected; half_open: one probe decides
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            self._state = "half_open"
+            self._probe_started_at = None
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a call may go upstream now"""
+        with self._lock:
+            state = self._current_state()
+            if state == "closed":
+                return True
+            if state == "open":
+                return False
+
+            # Half-open: let a single probe through; a lost probe is retried after the recovery time
+            now = time.monotonic()
+            if self._probe_started_at is None or now - self._probe_started_at >= self.recovery_seconds:
+                self._probe_started_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._probe_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._current_state() == "half_open" or self._failures >= self.failure_threshold:
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._probe_started_at = None
+
+    def release_probe(self):
+        """Give up a call that ended for reasons of our own, without counting it as a failure"""
+        with self._lock:
+            if self._state == "half_open":
+                self._probe_started_at = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state for health reporting"""
+        with self._lock:
+            state = self._current_state()
+            snapshot = {"state": state, "consecutive_failures": self._failures}
+            if state == "open":
+                snapshot["retry_in_seconds"] = round(self.recovery_seconds - (time.monotonic() - self._opened_at), 1)
+            return snapshot
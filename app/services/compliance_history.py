@@ -0,0 +1,145 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal, add_to_counters
+from app.models.models import (
+    ComplianceDailyBucket, ComplianceRequirement, Document,
+    DocumentStatus, RequirementStatus
+)
+
+BUCKET_COUNTERS = (
+    "documents_completed", "completed_score_sum", "score_delta",
+    "requirements_opened", "requirements_completed", "requirements_reopened",
+)
+
+def period_start(day: date, period: str) -> date:
+    """First day of the day, week (Monday) or month containing day"""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+def next_period(start: date, period: str) -> date:
+    if period == "week":
+        return start + timedelta(days=7)
+    if period == "month":
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+class ComplianceHistory:
+    """Daily per-user compliance counters, kept current so trends never scan documents"""
+
+    def record(self, db: Session, user_id: int, day: Optional[date] = None, **deltas: int):
+        """Add to a user's bucket for the day (UTC today by default) in the caller's transaction"""
+        deltas = {name: value for name, value in deltas.items() if value}
+        if not deltas or user_id is None:
+            return
+        day = day or datetime.utcnow().date()
+        add_to_counters(db, ComplianceDailyBucket, {"user_id": user_id, "day": day}, deltas)
+
+    def series(self, db: Session, user_id: int, start: date, end: date, period: str) -> List[Dict]:
+        """Activity per period from start to end, with running totals at each period's end"""
+        first = period_start(start, period)
+        counters = [func.coalesce(func.sum(getattr(ComplianceDailyBucket, name)), 0) for name in BUCKET_COUNTERS]
+
+        # Running totals start from everything before the range: one aggregate, not a scan
+        before = dict(zip(BUCKET_COUNTERS, db.query(*counters).filter(
+            ComplianceDailyBucket.user_id == user_id,
+            ComplianceDailyBucket.day < first
+        ).one()))
+        documents = before["documents_completed"]
+        score_total = before["score_delta"]
+        backlog = before["requirements_opened"] - before["requirements_completed"] + before["requirements_reopened"]
+
+        buckets = db.query(ComplianceDailyBucket).filter(
+            ComplianceDailyBucket.user_id == user_id,
+            ComplianceDailyBucket.day >= first,
+            ComplianceDailyBucket.day <= end
+        ).order_by(ComplianceDailyBucket.day).all()
+
+        # Roll days up into periods, keeping empty periods so charts have no gaps
+        periods: Dict[date, Dict[str, int]] = {}
+        current = first
+        while current <= end:
+            periods[current] = dict.fromkeys(BUCKET_COUNTERS, 0)
+            current = next_period(current, period)
+        for bucket in buckets:
+            totals = periods[period_start(bucket.day, period)]
+            for name in BUCKET_COUNTERS:
+                totals[name] += getattr(bucket, name)
+
+        series = []
+        for start_day, totals in periods.items():
+            documents += totals["documents_completed"]
+            score_total += totals["score_delta"]
+            backlog += totals["requirements_opened"] - totals["requirements_completed"] + totals["requirements_reopened"]
+            completed = totals["documents_completed"]
+            series.append({
+                "period_start": start_day,
+                "documents_processed": completed,
+                "average_new_score": round(totals["completed_score_sum"] / completed, 1) if completed else None,
+                "average_score": round(score_total / documents, 1) if documents else None,
+                "requirements_opened": totals["requirements_opened"],
+                "requirements_completed": totals["requirements_completed"],
+                "requirements_reopened": totals["requirements_reopened"],
+                "open_requirements": backlog,
+            })
+        return series
+
+    def backfill(self) -> Dict[str, int]:
+        """Rebuild every bucket from the current documents and requirements"""
+        with SessionLocal() as db:
+            totals: Dict[tuple, Dict[str, int]] = {}
+
+            def add(user_id, day, **deltas):
+                if user_id is None or day is None:
+                    return
+                bucket = totals.setdefault((user_id, _as_date(day)), dict.fromkeys(BUCKET_COUNTERS, 0))
+                for name, value in deltas.items():
+                    bucket[name] += value or 0
+
+            # Grouped in the database; only one row per user and day comes back
+            processed_day = func.date(Document.processed_at)
+            for user_id, day, count, score_sum in db.query(
+                Document.owner_id, processed_day, func.count(Document.id), func.sum(Document.compliance_score)
+            ).filter(
+                Document.status == DocumentStatus.COMPLETED
+            ).group_by(Document.owner_id, processed_day):
+                # Current scores stand in for the history of score changes
+                add(user_id, day, documents_completed=count, completed_score_sum=score_sum, score_delta=score_sum)
+
+            created_day = func.date(ComplianceRequirement.created_at)
+            for user_id, day, count in db.query(
+                ComplianceRequirement.owner_id, created_day, func.count(ComplianceRequirement.id)
+            ).group_by(ComplianceRequirement.owner_id, created_day):
+                add(user_id, day, requirements_opened=count)
+
+            # Completed before completed_at existed: count it on the day it was created
+            completed_day = func.date(func.coalesce(ComplianceRequirement.completed_at, ComplianceRequirement.created_at))
+            for user_id, day, count in db.query(
+                ComplianceRequirement.owner_id, completed_day, func.count(ComplianceRequirement.id)
+            ).filter(
+                ComplianceRequirement.status == RequirementStatus.COMPLETED
+            ).group_by(ComplianceRequirement.owner_id, completed_day):
+                add(user_id, day, requirements_completed=count)
+
+            db.query(ComplianceDailyBucket).delete(synchronize_session=False)
+            db.bulk_insert_mappings(ComplianceDailyBucket, [
+                {"user_id": user_id, "day": day, **counters}
+                for (user_id, day), counters in totals.items()
+            ])
+            db.commit()
+            return {"buckets": len(totals), "users": len({user_id for user_id, _ in totals})}
+
+def _as_date(value) -> date:
+    """DATE() comes back as a string on SQLite and a date elsewhere"""
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+# Global compliance history instance
+compliance_history = ComplianceHistory()
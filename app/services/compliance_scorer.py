@@ -0,0 +1,137 @@
+from typing import Dict, Sequence
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import (
+    ComplianceRequirement, Document, DocumentStatus,
+    RequirementPriority, RequirementStatus
+)
+from app.services.compliance_history import compliance_history
+
+# Requirement rows read per round trip by the full re-score
+RESCORE_BATCH_SIZE = 10000
+
+class ComplianceScorer:
+    """
+    Deterministic compliance score computed from stored requirement features
+    Each requirement weighs points by priority, scaled by its category and confidence;
+    its status earns a share of them. Score = 100 * (earned + H) / (total + H), so a
+    document owing H points (SCORE_HALF_POINTS) scores 50 and more risk scores lower
+    NumPy is imported on first use to keep it off the startup path
+    """
+
+    def __init__(self):
+        self.priority_points = {
+            priority: float(settings.score_priority_points.get(priority.value, 0.0))
+            for priority in RequirementPriority
+        }
+        self.status_credit = {
+            status: float(settings.score_status_credit.get(status.value, 0.0))
+            for status in RequirementStatus
+        }
+        self.category_multipliers = dict(settings.score_category_multipliers)
+
+    def _points(self, priorities: Sequence, categories: Sequence, statuses: Sequence, confidences: Sequence):
+        """Total and earned points of each requirement, as two arrays"""
+        import numpy as np
+
+        count = len(priorities)
+        points = np.fromiter((self.priority_points.get(p, 0.0) for p in priorities), float, count)
+        multipliers = np.fromiter(
+            (self.category_multipliers.get(c, settings.score_default_category_multiplier) for c in categories),
+            float, count
+        )
+        credit = np.fromiter((self.status_credit.get(s, 0.0) for s in statuses), float, count)
+        # None becomes NaN in a float array
+        confidence = np.array(confidences, dtype=float)
+        confidence = np.where(np.isnan(confidence), settings.score_default_confidence, confidence)
+        weights = points * multipliers * confidence
+        return weights, weights * credit
+
+    def _to_scores(self, total, earned):
+        import numpy as np
+
+        half = settings.score_half_points
+        # Nothing to earn (no requirements, or all weighted to zero) means fully compliant
+        ratio = np.divide(earned + half, total + half, out=np.ones_like(total, dtype=float), where=total + half > 0)
+        return np.clip(np.rint(100.0 * ratio), 0, 100).astype(int)
+
+    def score(self, requirements: Sequence) -> int:
+        """Score of one document from its requirements (models or RequirementBase, new ones count as pending)"""
+        if not requirements:
+            return 100
+        total, earned = self._points(
+            [req.priority for req in requirements],
+            [req.category for req in requirements],
+            [getattr(req, "status", None) or RequirementStatus.PENDING for req in requirements],
+            [req.confidence_score for req in requirements]
+        )
+        return int(self._to_scores(total.sum(keepdims=True), earned.sum(keepdims=True))[0])
+
+    def rescore_document(self, db: Session, document_id: int) -> int:
+        """Recompute one document's score after a requirement change; the caller commits"""
+        requirements = db.query(ComplianceRequirement).filter(
+            ComplianceRequirement.document_id == document_id
+        ).all()
+        score = self.score(requirements)
+        db.query(Document).filter(Document.id == document_id).update(
+            {Document.compliance_score: score}, synchronize_session=False
+        )
+        return score
+
+    def rescore_all(self) -> Dict[str, int]:
+        """Recompute the score of every completed document in one pass over the requirements"""
+        import numpy as np
+
+        with SessionLocal() as db:
+            rows = db.query(Document.id, Document.compliance_score, Document.owner_id).filter(
+                Document.status == DocumentStatus.COMPLETED
+            ).all()
+            current = {document_id: score for document_id, score, _ in rows}
+            owners = {document_id: owner_id for document_id, _, owner_id in rows}
+            if not current:
+                return {"scored": 0, "changed": 0}
+
+            # Total and earned points per document id, summed batch by batch
+            size = max(current) + 1
+            totals = np.zeros(size)
+            earned = np.zeros(size)
+            statement = select(
+                ComplianceRequirement.document_id, ComplianceRequirement.priority,
+                ComplianceRequirement.category, ComplianceRequirement.status,
+                ComplianceRequirement.confidence_score
+            ).where(
+                ComplianceRequirement.document_id.isnot(None)
+            ).execution_options(yield_per=RESCORE_BATCH_SIZE)
+
+            for batch in db.execute(statement).partitions():
+                document_ids, priorities, categories, statuses, confidences = zip(*batch)
+                ids = np.fromiter(document_ids, int, len(batch))
+                weights, credited = self._points(priorities, categories, statuses, confidences)
+                known = ids < size
+                totals += np.bincount(ids[known], weights=weights[known], minlength=size)
+                earned += np.bincount(ids[known], weights=credited[known], minlength=size)
+
+            ids = np.fromiter(current, int, len(current))
+            scores = self._to_scores(totals[ids], earned[ids])
+            changes = [
+                {"id": int(document_id), "compliance_score": int(score)}
+                for document_id, score in zip(ids, scores)
+                if current[int(document_id)] != score
+            ]
+            if changes:
+                # Bulk UPDATE by primary key
+                db.execute(update(Document), changes)
+                # Score trends see the policy change as of today
+                deltas: Dict[int, int] = {}
+                for change in changes:
+                    owner_id = owners[change["id"]]
+                    deltas[owner_id] = deltas.get(owner_id, 0) + change["compliance_score"] - (current[change["id"]] or 0)
+                for owner_id, delta in deltas.items():
+                    compliance_history.record(db, owner_id, score_delta=delta)
+                db.commit()
+            return {"scored": len(current), "changed": len(changes)}
+
+# Global scorer instance
+compliance_scorer = ComplianceScorer()
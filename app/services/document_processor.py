@@ -1,7 +1,8 @@
+import gzip
 import os
+import shutil
+import tempfile
 from typing import Tuple
-from pypdf import PdfReader
-from docx import Document
 from pathlib import Path
 
 class DocumentProcessor:
@@ -18,6 +19,10 @@ class DocumentProcessor:
         file_path = Path(file_path)
         file_extension = file_path.suffix.lower()
         
+        # Originals compressed by the storage lifecycle job
+        if file_extension == '.gz':
+            return self._extract_from_gzip(file_path)
+        
         if file_extension not in self.supported_types:
             raise ValueError(f"Unsupported file type: {file_extension}")
         
@@ -31,8 +36,22 @@ class DocumentProcessor:
         except Exception as e:
             raise Exception(f"Error extracting text from {file_path}: {str(e)}")
     
+    def _extract_from_gzip(self, file_path: Path) -> Tuple[str, str]:
+        """Decompress to a temporary file and extract from the original format"""
+        inner_suffix = Path(file_path.stem).suffix
+        with tempfile.NamedTemporaryFile(suffix=inner_suffix, delete=False) as temp_file:
+            with gzip.open(file_path, 'rb') as source:
+                shutil.copyfileobj(source, temp_file)
+        try:
+            return self.extract_text(temp_file.name)
+        finally:
+            os.remove(temp_file.name)
+    
     def _extract_from_pdf(self, file_path: Path) -> str:
         """Extract text from PDF using pypdf"""
+        # Imported on first use to keep application startup fast
+        from pypdf import PdfReader
+        
         try:
             reader = PdfReader(file_path)
             text = ""
@@ -44,6 +63,8 @@ class DocumentProcessor:
     
     def _extract_from_docx(self, file_path: Path) -> str:
         """Extract text from DOCX file"""
+        from docx import Document
+        
         try:
             doc = Document(file_path)
             text = ""
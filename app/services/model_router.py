@@ -0,0 +1,58 @@
+import threading
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.models.schemas import AnalysisResult
+
+# Analyses of a document type needed before its escalation rate is trusted
+MIN_HISTORY = 5
+
+# Weight of the newest outcome in the per-type escalation rate
+HISTORY_DECAY = 0.2
+
+class ModelRouter:
+    """Choose model tiers per document and decide when to escalate"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # document_type -> {"analyses": count, "escalation_rate": moving average}
+        self._history: Dict[str, Dict[str, float]] = {}
+
+    def plan(self, document_type: str) -> List[str]:
+        """Models to try in order, cheapest first"""
+        fast, strong = settings.claude_fast_model, settings.claude_strong_model
+
+        # Don't pay for a fast attempt on types that usually escalate anyway
+        with self._lock:
+            history = self._history.get(document_type)
+            if history and history["analyses"] >= MIN_HISTORY and history["escalation_rate"] >= settings.strong_first_escalation_rate:
+                # Relax the rate each time so the fast tier is re-tested eventually
+                history["escalation_rate"] *= 1 - HISTORY_DECAY
+                return [strong]
+
+        return [fast, strong]
+
+    def escalation_reason(self, result: AnalysisResult) -> Optional[str]:
+        """Why a tier's result isn't good enough, or None to accept it"""
+        if result.fallback:
+            return "response could not be parsed"
+
+        if len(result.requirements) < settings.escalation_min_requirements:
+            return f"only {len(result.requirements)} requirements found"
+
+        scores = [req.confidence_score for req in result.requirements if req.confidence_score is not None]
+        if scores:
+            mean_confidence = sum(scores) / len(scores)
+            if mean_confidence < settings.escalation_min_confidence:
+                return f"low confidence ({mean_confidence:.2f})"
+
+        return None
+
+    def record(self, document_type: str, escalated: bool):
+        """Feed an outcome of a fast-tier attempt back into routing"""
+        with self._lock:
+            history = self._history.setdefault(document_type, {"analyses": 0, "escalation_rate": 0.0})
+            history["analyses"] += 1
+            history["escalation_rate"] += HISTORY_DECAY * (float(escalated) - history["escalation_rate"])
+
+# Global model router instance
+model_router = ModelRouter()
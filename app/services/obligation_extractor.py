@@ -0,0 +1,242 @@
+import asyncio
+import bisect
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.models.models import RequirementPriority
+from app.models.schemas import AnalysisResult, RequirementBase
+from app.services.compliance_scorer import compliance_scorer
+
+# Sentence ends, clause-separating semicolons, blank lines and list items
+CLAUSE_BOUNDARY = re.compile(
+    r"(?<=[.!?;])\s+|\n[ \t]*\n\s*|\n(?=[ \t]*(?:[-•*]|\(?[a-z0-9]{1,3}[.)])\s)"
+)
+
+# Numbered or named section headings, markdown headings and short all-caps lines
+HEADING = re.compile(
+    r"^[ \t]*("
+    r"(?i:section|article|clause|part|chapter|schedule)\s+[0-9IVXivx]+(?:\.[0-9]+)*\b[^\n]{0,80}"
+    r"|[0-9]+(?:\.[0-9]+)*\.?[ \t]+[A-Z][^\n]{0,80}"
+    r"|#{1,6}[ \t]+[^\n]{1,80}"
+    r"|[A-Z][A-Z0-9 ,&/'()\-]{3,80}"
+    r")[ \t]*$",
+    re.MULTILINE
+)
+
+# Modal phrases, strongest first so "shall not" wins over "shall" at the same position
+OBLIGATION = re.compile(
+    r"\b(?:"
+    r"(?P<prohibition>(?:shall|must|may|will)\s+not|cannot|(?:is|are)\s+(?:strictly\s+)?prohibited|prohibited\s+from)"
+    r"|(?P<mandatory>shall|must|(?:is|are)\s+(?:required|obligated|obliged)\s+to|required\s+to"
+    r"|(?:has|have)\s+to|undertakes?\s+to|(?:is|are)\s+responsible\s+for|ensure\s+that)"
+    r"|(?P<commitment>agrees?\s+to|will\s+(?:ensure|provide|notify|maintain|retain|delete|comply|inform|keep))"
+    r"|(?P<advisory>should)"
+    r")\b",
+    re.IGNORECASE
+)
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "fourteen": 14, "fifteen": 15, "twenty": 20,
+    "thirty": 30, "forty-five": 45, "sixty": 60, "ninety": 90,
+}
+
+DEADLINE = re.compile(
+    r"\b(?:within|no\s+later\s+than|not\s+later\s+than|before\s+the\s+end\s+of)\s+"
+    r"(?P<amount>[0-9]+|" + "|".join(NUMBER_WORDS) + r")\s*(?:\([0-9]+\)\s*)?"
+    r"(?:business\s+|working\s+|calendar\s+)?(?P<unit>hours?|days?|weeks?|months?|years?)\b"
+    r"|\b(?P<urgent>immediately|without\s+(?:undue\s+)?delay|promptly|forthwith)\b",
+    re.IGNORECASE
+)
+
+UNIT_DAYS = {"hour": 1 / 24, "day": 1, "week": 7, "month": 30, "year": 365}
+
+# Checked in order; the first match decides the category, otherwise "operational"
+CATEGORY_PATTERNS = [
+    ("security", re.compile(
+        r"\b(?:secur\w*|breach\w*|encrypt\w*|passwords?|unauthori[sz]ed|access\s+controls?"
+        r"|incidents?|vulnerab\w*|malware|authenticat\w*|firewalls?)\b", re.IGNORECASE)),
+    ("user_rights", re.compile(
+        r"\b(?:right\s+to|rights\s+of|opt[- ]?out|unsubscribe|erasure|rectif\w*|portability"
+        r"|withdraw\w*\s+(?:\w+\s+)?consent|request\s+(?:access|deletion|a\s+copy)|object\s+to)\b", re.IGNORECASE)),
+    ("data_protection", re.compile(
+        r"\b(?:personal\s+(?:data|information)|privacy|data\s+subjects?|retention|retain\w*|consent"
+        r"|cookies?|gdpr|ccpa|hipaa|controllers?|processors?|process\w*\s+(?:of\s+)?(?:personal\s+)?data)\b", re.IGNORECASE)),
+    ("legal", re.compile(
+        r"\b(?:laws?|lawful\w*|legal\w*|courts?|jurisdiction|liab\w*|indemn\w*|arbitrat\w*|governing"
+        r"|disputes?|warrant\w*|terminat\w*|regulat\w*|statut\w*)\b", re.IGNORECASE)),
+]
+
+# Consequences that make a binding clause critical regardless of its deadline
+SEVERE = re.compile(r"\b(?:breach\w*|penalt\w*|fines?|criminal|sanctions?|revoc\w*|suspend\w*)\b", re.IGNORECASE)
+
+LABELS = {
+    "prohibition": "Prohibited",
+    "mandatory": "Required",
+    "commitment": "Committed",
+    "advisory": "Recommended",
+}
+
+BASE_CONFIDENCE = {"prohibition": 0.8, "mandatory": 0.8, "commitment": 0.6, "advisory": 0.4}
+
+PRIORITY_ORDER = [RequirementPriority.CRITICAL, RequirementPriority.HIGH, RequirementPriority.MEDIUM, RequirementPriority.LOW]
+
+WHITESPACE = re.compile(r"\s+")
+
+MIN_CLAUSE_CHARS = 20
+MAX_CLAUSE_CHARS = 1000
+MAX_PLAIN_CHARS = 300
+
+def _sections(text: str) -> Tuple[List[int], List[int], List[str]]:
+    """Start offsets, end offsets and titles of the headings in text"""
+    starts, ends, titles = [], [], []
+    for match in HEADING.finditer(text):
+        title = match.group(1).strip().lstrip("#").strip()
+        # A numbered line that reads like a sentence or states an obligation is a clause, not a heading
+        if title and title[-1] not in ".;,:" and not OBLIGATION.search(title):
+            starts.append(match.start())
+            ends.append(match.end())
+            titles.append(title)
+    return starts, ends, titles
+
+def _deadline_days(match: re.Match) -> float:
+    if match.group("urgent"):
+        return 0.0
+    amount = match.group("amount").lower()
+    count = int(amount) if amount.isdigit() else NUMBER_WORDS[amount]
+    return count * UNIT_DAYS[match.group("unit").lower().rstrip("s")]
+
+def _category(text: str) -> Optional[str]:
+    return next((name for name, pattern in CATEGORY_PATTERNS if pattern.search(text)), None)
+
+def _classify(clause: str, kind: str, deadline: Optional[re.Match], section: Optional[str]) -> Tuple[str, RequirementPriority]:
+    # The section title decides when the clause itself gives no hint
+    category = _category(clause) or (section and _category(section)) or "operational"
+
+    binding = kind in ("prohibition", "mandatory")
+    days = _deadline_days(deadline) if deadline else None
+    if binding and ((days is not None and days <= 3) or SEVERE.search(clause)):
+        priority = RequirementPriority.CRITICAL
+    elif kind == "prohibition" or (binding and (days is not None or category in ("security", "data_protection"))):
+        priority = RequirementPriority.HIGH
+    elif kind == "advisory":
+        priority = RequirementPriority.LOW
+    else:
+        priority = RequirementPriority.MEDIUM
+    return category, priority
+
+def _clauses(text: str):
+    """(offset, clause, paragraph number) for each clause of text"""
+    paragraph = 1
+    start = 0
+    for boundary in CLAUSE_BOUNDARY.finditer(text):
+        yield start, text[start:boundary.start()], paragraph
+        # Blank lines start a new paragraph
+        if boundary.group().count("\n") > 1:
+            paragraph += 1
+        start = boundary.end()
+    yield start, text[start:], paragraph
+
+def extract_requirements(text: str) -> List[RequirementBase]:
+    """Obligations found in text, in document order"""
+    starts, ends, titles = _sections(text)
+    requirements = []
+    seen = set()
+
+    for clause_start, clause, paragraph in _clauses(text):
+        # Headings end at a line break rather than a clause boundary; drop any overlapping part
+        clause_end = clause_start + len(clause)
+        section = bisect.bisect_left(starts, clause_end) - 1
+        if section >= 0 and ends[section] > clause_start:
+            clause_start = min(ends[section], clause_end)
+            clause = text[clause_start:clause_end]
+
+        if len(clause) < MIN_CLAUSE_CHARS:
+            continue
+        obligation = OBLIGATION.search(clause)
+        if not obligation:
+            continue
+
+        clause = WHITESPACE.sub(" ", clause).strip()[:MAX_CLAUSE_CHARS]
+        key = clause.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+
+        kind = obligation.lastgroup
+        deadline = DEADLINE.search(clause)
+        title = titles[section][:120] if section >= 0 else None
+        category, priority = _classify(clause, kind, deadline, title)
+
+        label = LABELS[kind] + (f" {WHITESPACE.sub(' ', deadline.group()).lower()}" if deadline else "")
+        plain = clause if len(clause) <= MAX_PLAIN_CHARS else clause[:MAX_PLAIN_CHARS - 3].rstrip() + "..."
+
+        requirements.append(RequirementBase(
+            requirement_text=clause,
+            plain_english=f"{label}: {plain}",
+            category=category,
+            priority=priority,
+            confidence_score=min(BASE_CONFIDENCE[kind] + (0.1 if deadline else 0.0), 0.95),
+            source_section=title or f"Paragraph {paragraph}"
+        ))
+
+    # Keep the most important ones when a long document yields too many
+    limit = settings.extractor_max_requirements
+    if len(requirements) > limit:
+        ranked = sorted(range(len(requirements)), key=lambda i: PRIORITY_ORDER.index(requirements[i].priority))
+        keep = sorted(ranked[:limit])
+        requirements = [requirements[i] for i in keep]
+    return requirements
+
+def extract_analysis(text: str) -> AnalysisResult:
+    """Deterministic analysis of a document; runs in a worker process for large inputs"""
+    requirements = extract_requirements(text)
+    counts = {priority: 0 for priority in PRIORITY_ORDER}
+    for req in requirements:
+        counts[req.priority] += 1
+
+    return AnalysisResult(
+        summary=(
+            f"Found {len(requirements)} obligations in about {len(text.split())} words by local pattern extraction "
+            f"({counts[RequirementPriority.CRITICAL]} critical, {counts[RequirementPriority.HIGH]} high priority). "
+            "AI analysis was unavailable; review the results."
+        ),
+        compliance_score=compliance_scorer.score(requirements),
+        requirements=requirements,
+        fallback=True
+    )
+
+class ObligationExtractor:
+    """Runs extraction off the event loop, in a process pool for large documents"""
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs threads and an event loop isn't safe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.extractor_pool_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    async def analyze(self, text: str) -> AnalysisResult:
+        if settings.extractor_pool_workers > 0 and len(text) >= settings.extractor_pool_min_chars:
+            return await asyncio.get_running_loop().run_in_executor(self._get_pool(), extract_analysis, text)
+        return await run_in_threadpool(extract_analysis, text)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+# Global extractor instance
+obligation_extractor = ObligationExtractor()
@@ -0,0 +1,184 @@
+import math
+import re
+import time
+import uuid
+from typing import Optional, Tuple
+from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from app.core.config import settings
+from app.core.database import SessionLocal, add_to_counters
+from app.models.models import RateLimitCounter, InflightSlot
+
+# Endpoints subject to the per-user sliding window (method, path pattern)
+RATE_LIMITED_ROUTES = [
+    ("POST", re.compile(r"/api/documents/upload")),
+    ("POST", re.compile(r"/api/documents/ingest-url")),
+    ("POST", re.compile(r"/api/documents/\d+/ask")),
+    ("GET", re.compile(r"/api/requirements/export")),
+]
+
+# Endpoints that hold an in-flight slot while they run
+CONCURRENCY_LIMITED_ROUTES = [
+    ("POST", re.compile(r"/api/documents/upload")),
+    ("POST", re.compile(r"/api/documents/ingest-url")),
+]
+
+def _matches(routes, method: str, path: str) -> bool:
+    return any(method == route_method and pattern.fullmatch(path) for route_method, pattern in routes)
+
+class RateLimiter:
+    """Per-user sliding-window limits and in-flight caps backed by the database"""
+
+    def check_rate(self, key: str) -> Optional[int]:
+        """
+        Count a request against the caller's sliding window
+        Returns: None if allowed, otherwise seconds until retry
+        """
+        window = settings.rate_limit_window_seconds
+        limit = settings.rate_limit_requests
+        now = time.time()
+        current = int(now // window) * window
+        previous = current - window
+
+        with SessionLocal() as db:
+            # Increment and commit first so concurrent workers never both squeeze under the limit
+            add_to_counters(db, RateLimitCounter, {"key": key, "window_start": current}, {"count": 1})
+            db.commit()
+            counts = dict(
+                db.query(RateLimitCounter.window_start, RateLimitCounter.count).filter(
+                    RateLimitCounter.key == key,
+                    RateLimitCounter.window_start.in_([previous, current])
+                ).all()
+            )
+
+            elapsed = now - current
+            previous_count = counts.get(previous, 0)
+            current_count = counts.get(current, 0)
+            estimated = previous_count * (window - elapsed) / window + current_count
+
+            if estimated <= limit:
+                # Drop windows that can no longer contribute to the estimate
+                db.query(RateLimitCounter).filter(
+                    RateLimitCounter.key == key,
+                    RateLimitCounter.window_start < previous
+                ).delete(synchronize_session=False)
+                db.commit()
+                return None
+
+            # Rejected requests don't consume quota
+            add_to_counters(db, RateLimitCounter, {"key": key, "window_start": current}, {"count": -1})
+            db.commit()
+
+        # Earliest time the sliding estimate, counting one more request, is back within the limit
+        current_count -= 1
+        room = limit - current_count - 1
+        if room >= 0 and previous_count:
+            # Within this window, once enough of the previous window has decayed
+            wait = (window - elapsed) - room * window / previous_count
+        else:
+            # After the boundary, where this window's count carries over as the previous one
+            wait = window - elapsed
+            if current_count > 0 and room < 0:
+                wait += window - (limit - 1) * window / current_count
+        return max(1, math.ceil(wait))
+
+    def acquire_slot(self, key: str) -> Tuple[Optional[str], int]:
+        """
+        Reserve an in-flight slot for the caller
+        Returns: (slot_id, 0) on success, otherwise (None, rejection status code)
+        """
+        now = time.time()
+        slot_id = uuid.uuid4().hex
+
+        with SessionLocal() as db:
+            db.query(InflightSlot).filter(InflightSlot.expires_at < now).delete(synchronize_session=False)
+
+            # Publish the slot before counting so simultaneous requests in other
+            # workers see each other; under contention both may back off, but
+            # the caps are never exceeded
+            db.add(InflightSlot(
+                id=slot_id,
+                key=key,
+                expires_at=now + settings.upload_slot_lease_seconds
+            ))
+            db.commit()
+
+            user_count = db.query(InflightSlot).filter(InflightSlot.key == key).count()
+            global_count = db.query(InflightSlot).count()
+
+            if user_count > settings.max_concurrent_uploads_per_user:
+                status_code = 429
+            elif global_count > settings.max_concurrent_uploads_global:
+                status_code = 503
+            else:
+                return slot_id, 0
+
+            db.query(InflightSlot).filter(InflightSlot.id == slot_id).delete(synchronize_session=False)
+            db.commit()
+            return None, status_code
+
+    def release_slot(self, slot_id: str):
+        """Free a previously acquired in-flight slot"""
+        with SessionLocal() as db:
+            db.query(InflightSlot).filter(InflightSlot.id == slot_id).delete(synchronize_session=False)
+            db.commit()
+
+def client_key(request: Request) -> str:
+    """Identify the caller by token subject, falling back to client address"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+def _reject(status_code: int, detail: str, retry_after: int) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(retry_after)}
+    )
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Reject excess traffic on expensive endpoints instead of queuing it"""
+
+    async def dispatch(self, request: Request, call_next):
+        rate_limited = _matches(RATE_LIMITED_ROUTES, request.method, request.url.path)
+        concurrency_limited = _matches(CONCURRENCY_LIMITED_ROUTES, request.method, request.url.path)
+        if not rate_limited and not concurrency_limited:
+            return await call_next(request)
+
+        key = client_key(request)
+        slot_id = None
+        try:
+            if rate_limited:
+                retry_after = await run_in_threadpool(rate_limiter.check_rate, key)
+                if retry_after:
+                    return _reject(429, "Rate limit exceeded", retry_after)
+
+            if concurrency_limited:
+                slot_id, status_code = await run_in_threadpool(rate_limiter.acquire_slot, key)
+                if status_code == 429:
+                    return _reject(429, "Too many concurrent uploads", settings.admission_retry_after_seconds)
+                if status_code == 503:
+                    return _reject(503, "Server busy, try again shortly", settings.admission_retry_after_seconds)
+        except Exception as e:
+            # Fail open: a limiter outage shouldn't take the endpoint down with it
+            print(f"Rate limiter error: {e}")
+
+        try:
+            return await call_next(request)
+        finally:
+            if slot_id:
+                await run_in_threadpool(rate_limiter.release_slot, slot_id)
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
@@ -0,0 +1,85 @@
+import hashlib
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.models import SharedAnalysis
+from app.models.schemas import AnalysisResult
+
+# Query parameters that identify the visitor, not the page
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "ref", "_ga"}
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a page URL so equivalent links share one cache entry"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        raise ValueError("Only http and https URLs are supported")
+
+    host = (parts.hostname or "").lower()
+    if not host:
+        raise ValueError("URL has no host")
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+
+    # Fragments never reach the server, so they can't change the content
+    return urlunsplit((scheme, host, path, query, ""))
+
+def normalize_content(content: str) -> str:
+    """Collapse whitespace so layout-only differences don't defeat the cache"""
+    return " ".join(content.split())
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(normalize_content(content).encode("utf-8")).hexdigest()
+
+def get_shared_analysis(db: Session, url_key: str, digest: str) -> Optional[SharedAnalysis]:
+    """Look up a cached analysis for this exact page content and count the hit"""
+    shared = db.query(SharedAnalysis).filter(
+        SharedAnalysis.url_key == url_key,
+        SharedAnalysis.content_hash == digest
+    ).first()
+    if shared:
+        # Incremented in the database so concurrent hits on a popular page don't lose counts
+        db.execute(
+            update(SharedAnalysis).where(SharedAnalysis.id == shared.id)
+            .values(hit_count=SharedAnalysis.hit_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    return shared
+
+def store_shared_analysis(
+    db: Session, url_key: str, digest: str, text: str, analysis: AnalysisResult
+) -> SharedAnalysis:
+    """Save an analysis for reuse, keeping the existing row if another request won the race"""
+    shared = SharedAnalysis(
+        url_key=url_key,
+        content_hash=digest,
+        extracted_text=text,
+        analysis_json=analysis.model_dump_json(),
+        hit_count=0
+    )
+    db.add(shared)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        shared = db.query(SharedAnalysis).filter(
+            SharedAnalysis.url_key == url_key,
+            SharedAnalysis.content_hash == digest
+        ).one()
+    return shared
+
+def load_analysis(shared: SharedAnalysis) -> AnalysisResult:
+    return AnalysisResult.model_validate_json(shared.analysis_json)
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.deadline import get_deadline
+from app.models.models import AnalysisJob, JobStatus
+from app.models.schemas import AnalysisResult
+
+class AnalysisJobFailed(Exception):
+    """The shared analysis failed; raised to every request waiting on it"""
+
+def analysis_key(text: str, document_type: str) -> str:
+    """Identity of an analysis: identical text and type give identical work"""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{digest}:{document_type}"
+
+class SingleFlight:
+    """
+    Run each distinct analysis once while duplicates wait for its result
+    Within a worker duplicates share a future; across workers they share an AnalysisJob row
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, work: Callable[[], Awaitable[AnalysisResult]]) -> AnalysisResult:
+        future = self._inflight.get(key)
+        if future is not None:
+            # shield: a waiter timing out must not cancel the leader's work
+            return await asyncio.wait_for(asyncio.shield(future), timeout=get_deadline().remaining())
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._run_shared(key, work)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        except BaseException:
+            # Cancelled, e.g. the client disconnected
+            future.set_exception(AnalysisJobFailed("Shared analysis was cancelled"))
+            raise
+        finally:
+            del self._inflight[key]
+            # Mark any exception retrieved so asyncio doesn't warn when nobody else waited
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    async def _run_shared(self, key: str, work: Callable[[], Awaitable[AnalysisResult]]) -> AnalysisResult:
+        deadline = get_deadline()
+        while True:
+            role, result = await run_in_threadpool(self._claim, key)
+            if role == "done":
+                return result
+
+            if role == "leader":
+                try:
+                    result = await work()
+                except Exception as e:
+                    await run_in_threadpool(self._finish, key, None, str(e) or repr(e))
+                    raise
+                except BaseException:
+                    # Cancelled: let other workers take over right away
+                    self._abandon(key)
+                    raise
+                await run_in_threadpool(self._finish, key, result, None)
+                return result
+
+            # Another worker is running it: wait for its row to finish
+            while True:
+                if deadline.expired:
+                    raise asyncio.TimeoutError("Timed out waiting for a shared analysis")
+                await asyncio.sleep(min(settings.analysis_job_poll_seconds, deadline.remaining()))
+
+                status, result, error = await run_in_threadpool(self._poll, key)
+                if status == JobStatus.COMPLETED:
+                    return result
+                if status == JobStatus.FAILED:
+                    raise AnalysisJobFailed(error)
+                if status is None:
+                    # Abandoned by its worker; try to claim it ourselves
+                    break
+
+    def _claim(self, key: str) -> Tuple[str, Optional[AnalysisResult]]:
+        """
+        Decide this request's role for a job
+        Returns: ("leader", None), ("follower", None) or ("done", result)
+        """
+        now = time.time()
+        with SessionLocal() as db:
+            job = db.query(AnalysisJob).filter(AnalysisJob.key == key).first()
+
+            if job is None:
+                db.add(AnalysisJob(
+                    key=key,
+                    status=JobStatus.RUNNING,
+                    lease_expires_at=now + settings.analysis_job_lease_seconds,
+                    updated_at=now
+                ))
+                try:
+                    db.commit()
+                    return "leader", None
+                except IntegrityError:
+                    db.rollback()
+                    return "follower", None
+
+            if job.status == JobStatus.COMPLETED and now - job.updated_at < settings.analysis_job_ttl_seconds:
+                result = AnalysisResult.model_validate_json(job.result_json)
+                # Fallbacks are recomputed; a real analysis may be possible now
+                if not result.fallback:
+                    return "done", result
+            elif job.status == JobStatus.RUNNING and job.lease_expires_at > now:
+                return "follower", None
+
+            # Failed, expired or abandoned: take it over unless another worker just did
+            taken = db.query(AnalysisJob).filter(
+                AnalysisJob.id == job.id,
+                AnalysisJob.updated_at == job.updated_at
+            ).update({
+                AnalysisJob.status: JobStatus.RUNNING,
+                AnalysisJob.result_json: None,
+                AnalysisJob.error: None,
+                AnalysisJob.lease_expires_at: now + settings.analysis_job_lease_seconds,
+                AnalysisJob.updated_at: now
+            }, synchronize_session=False)
+            db.commit()
+            return ("leader", None) if taken else ("follower", None)
+
+    def _poll(self, key: str) -> Tuple[Optional[JobStatus], Optional[AnalysisResult], Optional[str]]:
+        """Current outcome of a job; status None means nobody is working on it"""
+        with SessionLocal() as db:
+            job = db.query(AnalysisJob).filter(AnalysisJob.key == key).first()
+            if job is None:
+                return None, None, None
+            if job.status == JobStatus.COMPLETED:
+                return job.status, AnalysisResult.model_validate_json(job.result_json), None
+            if job.status == JobStatus.FAILED:
+                return job.status, None, job.error
+            if job.lease_expires_at <= time.time():
+                return None, None, None
+            return job.status, None, None
+
+    def _finish(self, key: str, result: Optional[AnalysisResult], error: Optional[str]):
+        with SessionLocal() as db:
+            db.query(AnalysisJob).filter(AnalysisJob.key == key).update({
+                AnalysisJob.status: JobStatus.FAILED if error else JobStatus.COMPLETED,
+                AnalysisJob.result_json: result.model_dump_json() if result else None,
+                AnalysisJob.error: error,
+                AnalysisJob.updated_at: time.time()
+            }, synchronize_session=False)
+            db.commit()
+
+    def _abandon(self, key: str):
+        """Expire the lease of a job this worker will not finish"""
+        try:
+            with SessionLocal() as db:
+                db.query(AnalysisJob).filter(
+                    AnalysisJob.key == key,
+                    AnalysisJob.status == JobStatus.RUNNING
+                ).update({AnalysisJob.lease_expires_at: 0.0}, synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            print(f"Failed to release analysis job {key}: {e}")
+
+    def remove_expired_jobs(self, limit: int) -> int:
+        """Delete finished jobs past their reuse window"""
+        cutoff = time.time() - settings.analysis_job_ttl_seconds
+        with SessionLocal() as db:
+            ids = [job_id for (job_id,) in db.query(AnalysisJob.id).filter(
+                AnalysisJob.status != JobStatus.RUNNING,
+                AnalysisJob.updated_at < cutoff
+            ).limit(limit)]
+            if ids:
+                db.query(AnalysisJob).filter(AnalysisJob.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+            return len(ids)
+
+# Global single-flight instance
+single_flight = SingleFlight()
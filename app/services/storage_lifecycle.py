@@ -0,0 +1,258 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, List, Set
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import AnalysisTelemetry, Document, ComplianceRequirement, DocumentStatus, JobLease
+from app.services.usage_tracker import usage_tracker
+from app.services.single_flight import single_flight
+from app.services.telemetry import telemetry
+
+LEASE_NAME = "storage_lifecycle"
+
+# Two levels of 256 buckets keep directories small at millions of files
+SHARD_PREFIXES = [f"{i:02x}" for i in range(256)]
+
+def sharded_upload_path(filename: str) -> str:
+    """Location for an upload under hashed subdirectories of the upload dir"""
+    digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+    return os.path.join(settings.upload_dir, digest[:2], digest[2:4], filename)
+
+def path_spellings(path: str) -> Set[str]:
+    """Ways a stored file_path may spell this file, whatever form UPLOAD_DIR had when it was written"""
+    spellings = {path}
+    for full in (os.path.abspath(path), os.path.realpath(path)):
+        spellings.add(full)
+        try:
+            relative = os.path.relpath(full)
+        except ValueError:
+            # Another drive on Windows
+            continue
+        spellings.update((relative, os.path.join(os.curdir, relative)))
+    return spellings
+
+class StorageLifecycleManager:
+    """Background retention job for uploads/ and usage history"""
+
+    def __init__(self):
+        # Next top-level shard to scan for orphans; each run continues where the last stopped
+        self._orphan_cursor = 0
+        self._worker_id = uuid.uuid4().hex
+
+    async def run_forever(self):
+        """Run the lifecycle job periodically without blocking request handling"""
+        while True:
+            await asyncio.sleep(settings.storage_lifecycle_interval_seconds)
+            try:
+                if await run_in_threadpool(self._acquire_lease):
+                    await run_in_threadpool(self.run_once)
+            except Exception as e:
+                print(f"Storage lifecycle run failed: {e}")
+
+    def _acquire_lease(self) -> bool:
+        """Claim this interval's run; every worker has a loop but only one runs per interval"""
+        now = time.time()
+        # Held for most of the interval, so workers waking a little later skip it too
+        expires_at = now + settings.storage_lifecycle_interval_seconds * 0.9
+
+        with SessionLocal() as db:
+            taken = db.execute(update(JobLease).where(
+                JobLease.name == LEASE_NAME,
+                or_(JobLease.expires_at < now, JobLease.holder == self._worker_id)
+            ).values(holder=self._worker_id, expires_at=expires_at)).rowcount
+            if taken:
+                db.commit()
+                return True
+
+            if db.query(JobLease.name).filter(JobLease.name == LEASE_NAME).first():
+                return False
+            try:
+                db.add(JobLease(name=LEASE_NAME, holder=self._worker_id, expires_at=expires_at))
+                db.commit()
+                return True
+            except IntegrityError:
+                # Another worker created the lease first
+                db.rollback()
+                return False
+
+    def run_once(self) -> Dict[str, int]:
+        """Run one bounded pass of every retention step; a failing step doesn't stop the others"""
+        steps = {
+            "failed_removed": self.remove_failed_uploads,
+            "sharded": self.shard_flat_uploads,
+            "orphans_removed": self.remove_orphaned_files,
+            "compressed": self.compress_old_uploads,
+            "usage_days_rolled_up": lambda: usage_tracker.rollup_daily_usage(settings.usage_history_retention_days),
+            "analysis_jobs_removed": lambda: single_flight.remove_expired_jobs(settings.storage_lifecycle_batch_size),
+            "telemetry_rows_removed": lambda: telemetry.remove_expired_rows(settings.storage_lifecycle_batch_size),
+        }
+        stats = {}
+        for name, step in steps.items():
+            try:
+                stats[name] = step()
+            except Exception as e:
+                print(f"Storage lifecycle step {name} failed: {e}")
+                stats[name] = 0
+        if any(stats.values()):
+            print(f"Storage lifecycle: {stats}")
+        return stats
+
+    def remove_failed_uploads(self) -> int:
+        """Delete failed documents and their files once past retention"""
+        cutoff = datetime.utcnow() - timedelta(days=settings.failed_upload_retention_days)
+        removed = 0
+
+        with SessionLocal() as db:
+            documents = db.query(Document).filter(
+                Document.status == DocumentStatus.FAILED,
+                Document.created_at < cutoff
+            ).limit(settings.storage_lifecycle_batch_size).all()
+
+            for document in documents:
+                self._remove_file(document.file_path)
+                db.query(ComplianceRequirement).filter(
+                    ComplianceRequirement.document_id == document.id
+                ).delete(synchronize_session=False)
+                # Telemetry outlives the document; keep its cost history, drop the link
+                db.query(AnalysisTelemetry).filter(
+                    AnalysisTelemetry.document_id == document.id
+                ).update({AnalysisTelemetry.document_id: None}, synchronize_session=False)
+                db.delete(document)
+                removed += 1
+
+            db.commit()
+
+        return removed
+
+    def shard_flat_uploads(self) -> int:
+        """Move files stored directly in the upload dir into hashed subdirectories"""
+        if not os.path.isdir(settings.upload_dir):
+            return 0
+
+        with os.scandir(settings.upload_dir) as entries:
+            flat_files = list(islice(
+                (entry for entry in entries if entry.is_file()),
+                settings.storage_lifecycle_batch_size
+            ))
+
+        moved = 0
+        with SessionLocal() as db:
+            for entry in flat_files:
+                new_path = sharded_upload_path(entry.name)
+                try:
+                    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                    shutil.move(entry.path, new_path)
+                except OSError as e:
+                    print(f"Failed to shard {entry.path}: {e}")
+                    continue
+
+                db.query(Document).filter(Document.file_path.in_(path_spellings(entry.path))).update(
+                    {Document.file_path: new_path}, synchronize_session=False
+                )
+                db.commit()
+                moved += 1
+
+        return moved
+
+    def remove_orphaned_files(self) -> int:
+        """Delete files no Document row points at, scanning a few shards per run"""
+        grace_cutoff = time.time() - settings.orphan_upload_grace_hours * 3600
+        candidates: List[str] = []
+        scanned_shards = 0
+
+        while len(candidates) < settings.storage_lifecycle_batch_size and scanned_shards < len(SHARD_PREFIXES):
+            shard_dir = os.path.join(settings.upload_dir, SHARD_PREFIXES[self._orphan_cursor])
+            self._orphan_cursor = (self._orphan_cursor + 1) % len(SHARD_PREFIXES)
+            scanned_shards += 1
+
+            for root, _, files in os.walk(shard_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        if os.path.getmtime(path) < grace_cutoff:
+                            candidates.append(path)
+                    except OSError:
+                        continue
+
+        if not candidates:
+            return 0
+
+        # Compared as real paths: rows may spell the upload dir differently than the walk does
+        with SessionLocal() as db:
+            referenced = set()
+            for start in range(0, len(candidates), 100):
+                spellings = set()
+                for path in candidates[start:start + 100]:
+                    spellings.update(path_spellings(path))
+                referenced.update(
+                    os.path.realpath(path)
+                    for (path,) in db.query(Document.file_path).filter(Document.file_path.in_(spellings))
+                )
+
+        removed = 0
+        for path in candidates:
+            if os.path.realpath(path) not in referenced and self._remove_file(path):
+                removed += 1
+        return removed
+
+    def compress_old_uploads(self) -> int:
+        """Gzip originals of completed documents older than the configured age"""
+        cutoff = datetime.utcnow() - timedelta(days=settings.compress_uploads_after_days)
+        compressed = 0
+
+        with SessionLocal() as db:
+            documents = db.query(Document).filter(
+                Document.status == DocumentStatus.COMPLETED,
+                Document.created_at < cutoff,
+                Document.file_path.like(os.path.join(settings.upload_dir, "%")),
+                Document.file_path.notlike("%.gz")
+            ).limit(settings.storage_lifecycle_batch_size).all()
+
+            for document in documents:
+                original_path = document.file_path
+                compressed_path = original_path + ".gz"
+                # Write under a unique name and rename into place, so the .gz is never partial
+                temp_path = f"{compressed_path}.{uuid.uuid4().hex}.tmp"
+                try:
+                    with open(original_path, "rb") as source, gzip.open(temp_path, "wb") as target:
+                        shutil.copyfileobj(source, target)
+                    os.replace(temp_path, compressed_path)
+                except OSError as e:
+                    print(f"Failed to compress {original_path}: {e}")
+                    self._remove_file(temp_path)
+                    continue
+
+                # Only the run that switches the path removes the original
+                switched = db.query(Document).filter(
+                    Document.id == document.id,
+                    Document.file_path == original_path
+                ).update({Document.file_path: compressed_path}, synchronize_session=False)
+                db.commit()
+                if switched:
+                    self._remove_file(original_path)
+                    compressed += 1
+
+        return compressed
+
+    def _remove_file(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"Failed to remove {path}: {e}")
+            return False
+
+# Global storage lifecycle instance
+storage_lifecycle = StorageLifecycleManager()
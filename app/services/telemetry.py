@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import SessionLocal, add_to_counters
+from app.models.models import AnalysisTelemetry, UsageDailyBucket
+
+# Columns of UsageDailyBucket that identify a bucket, and those summed into it
+BUCKET_KEYS = ("user_id", "operation", "document_type", "model", "outcome")
+BUCKET_SUMS = ("claude_calls", "input_tokens", "output_tokens", "cost_usd", "text_chars", "claude_ms", "total_ms")
+
+_current_trace: ContextVar[Optional["AnalysisTrace"]] = ContextVar("analysis_trace", default=None)
+
+def current_trace() -> Optional["AnalysisTrace"]:
+    """Trace of the analysis running in this request, if any"""
+    return _current_trace.get()
+
+class AnalysisTrace:
+    """Measurements of one analysis or question, filled in as it runs"""
+
+    def __init__(self, user_id: int, operation: str, document_type: str,
+                 document_id: Optional[int] = None, file_size: Optional[int] = None):
+        self.user_id = user_id
+        self.operation = operation
+        self.document_type = document_type
+        self.document_id = document_id
+        self.file_size = file_size
+        self.text_chars: Optional[int] = None
+        self.model: Optional[str] = None
+        self.outcome: Optional[str] = None
+        self.claude_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self.stages: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Add the time spent in the block to a stage, in milliseconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def add_call(self, model: str, input_tokens: int, output_tokens: int, latency_ms: float):
+        """Attribute one Claude call and its cost to this trace"""
+        self.model = model
+        self.claude_calls += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cost_usd += (
+            input_tokens * settings.model_input_cost_per_million.get(model, 0.0)
+            + output_tokens * settings.model_output_cost_per_million.get(model, 0.0)
+        ) / 1_000_000
+        self.stages["claude"] = self.stages.get("claude", 0.0) + latency_ms
+
+    def to_row(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "document_id": self.document_id,
+            "operation": self.operation,
+            "document_type": self.document_type,
+            "model": self.model or "local",
+            "outcome": self.outcome or "failed",
+            "claude_calls": self.claude_calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": self.cost_usd,
+            "file_size": self.file_size,
+            "text_chars": self.text_chars,
+            "extract_ms": self.stages.get("extract"),
+            "analysis_ms": self.stages.get("analysis"),
+            "claude_ms": self.stages.get("claude"),
+            "save_ms": self.stages.get("save"),
+            "total_ms": (time.perf_counter() - self._started) * 1000,
+            "created_at": datetime.utcnow(),
+        }
+
+class TelemetryRecorder:
+    """Buffer telemetry rows in memory and batch-insert them off the request path"""
+
+    def __init__(self):
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, user_id: int, operation: str, document_type: str,
+              document_id: Optional[int] = None, file_size: Optional[int] = None):
+        """Trace the block as one analysis; Claude calls inside it are attributed to it"""
+        trace = AnalysisTrace(user_id, operation, document_type, document_id, file_size)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            if settings.telemetry_enabled:
+                self.record(trace.to_row())
+
+    def record(self, row: dict):
+        with self._lock:
+            self._buffer.append(row)
+            overflow = len(self._buffer) - settings.telemetry_max_buffer
+            if overflow > 0:
+                del self._buffer[:overflow]
+                print(f"Telemetry buffer full, dropped {overflow} rows")
+
+    async def run_forever(self):
+        """Flush the buffer periodically; flushes once more on shutdown"""
+        try:
+            while True:
+                await asyncio.sleep(settings.telemetry_flush_seconds)
+                await run_in_threadpool(self.flush)
+        finally:
+            await run_in_threadpool(self.flush)
+
+    def flush(self) -> int:
+        """Insert buffered rows and add them to their daily buckets in one transaction"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+
+        try:
+            with SessionLocal() as db:
+                db.execute(insert(AnalysisTelemetry), rows)
+                for key, sums in self._bucket_totals(rows).items():
+                    add_to_counters(db, UsageDailyBucket, dict(zip(("day",) + BUCKET_KEYS, key)), sums)
+                db.commit()
+        except Exception as e:
+            print(f"Telemetry flush failed: {e}")
+            # Keep the rows for the next flush, within the buffer limit
+            with self._lock:
+                room = settings.telemetry_max_buffer - len(self._buffer)
+                # rows[-0:] would be every row, so a full buffer takes none back
+                if room > 0:
+                    self._buffer[:0] = rows[-room:]
+            return 0
+        return len(rows)
+
+    def _bucket_totals(self, rows: List[dict]) -> Dict[Tuple, Dict[str, float]]:
+        totals: Dict[Tuple, Dict[str, float]] = {}
+        for row in rows:
+            key = (row["created_at"].date(),) + tuple(row[name] for name in BUCKET_KEYS)
+            sums = totals.setdefault(key, dict.fromkeys(("count",) + BUCKET_SUMS, 0))
+            sums["count"] += 1
+            for name in BUCKET_SUMS:
+                sums[name] += row[name] or 0
+        return totals
+
+    def remove_expired_rows(self, limit: int) -> int:
+        """Delete raw rows past retention; their daily buckets remain"""
+        cutoff = datetime.utcnow() - timedelta(days=settings.telemetry_retention_days)
+        with SessionLocal() as db:
+            ids = [row_id for (row_id,) in db.query(AnalysisTelemetry.id).filter(
+                AnalysisTelemetry.created_at < cutoff
+            ).limit(limit)]
+            if ids:
+                db.query(AnalysisTelemetry).filter(AnalysisTelemetry.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+            return len(ids)
+
+# Global telemetry recorder instance
+telemetry = TelemetryRecorder()
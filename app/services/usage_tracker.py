@@ -1,6 +1,7 @@
 import json
 import os
-from datetime import datetime, date
+import threading
+from datetime import datetime, date, timedelta
 from typing import Dict, Any
 from app.core.config import settings
 
@@ -9,7 +10,15 @@ class UsageTracker:
     
     def __init__(self, usage_file: str = "usage_tracking.json"):
         self.usage_file = usage_file
-        self.usage_data = self._load_usage_data()
+        self._usage_data = None
+        self._lock = threading.RLock()
+    
+    @property
+    def usage_data(self) -> Dict[str, Any]:
+        """Usage data, loaded from file on first access"""
+        if self._usage_data is None:
+            self._usage_data = self._load_usage_data()
+        return self._usage_data
     
     def _load_usage_data(self) -> Dict[str, Any]:
         """Load usage data from file"""
@@ -45,15 +54,36 @@ class UsageTracker:
         """Record API usage"""
         today = str(date.today())
         
-        if today not in self.usage_data["daily_usage"]:
-            self.usage_data["daily_usage"][today] = {"requests": 0, "tokens": 0}
+        with self._lock:
+            if today not in self.usage_data["daily_usage"]:
+                self.usage_data["daily_usage"][today] = {"requests": 0, "tokens": 0}
+            
+            self.usage_data["daily_usage"][today]["requests"] += 1
+            self.usage_data["daily_usage"][today]["tokens"] += tokens_used
+            self.usage_data["total_requests"] += 1
+            self.usage_data["total_tokens"] += tokens_used
+            
+            self._save_usage_data()
+    
+    def rollup_daily_usage(self, keep_days: int) -> int:
+        """Fold daily entries older than keep_days into monthly totals"""
+        cutoff = str(date.today() - timedelta(days=keep_days))
         
-        self.usage_data["daily_usage"][today]["requests"] += 1
-        self.usage_data["daily_usage"][today]["tokens"] += tokens_used
-        self.usage_data["total_requests"] += 1
-        self.usage_data["total_tokens"] += tokens_used
+        with self._lock:
+            daily_usage = self.usage_data["daily_usage"]
+            monthly_usage = self.usage_data.setdefault("monthly_usage", {})
+            old_days = [day for day in daily_usage if day < cutoff]
+            
+            for day in old_days:
+                month = monthly_usage.setdefault(day[:7], {"requests": 0, "tokens": 0})
+                month["requests"] += daily_usage[day]["requests"]
+                month["tokens"] += daily_usage[day]["tokens"]
+                del daily_usage[day]
+            
+            if old_days:
+                self._save_usage_data()
         
-        self._save_usage_data()
+        return len(old_days)
     
     def get_daily_usage(self) -> Dict[str, int]:
         """Get today's usage stats"""
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the ComplianceAI FastAPI application.
+Reports module import cost (python -X importtime) and the time from
+launching uvicorn to the first 200 response from /health.
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+def measure_import_time(top: int):
+    """Import app.main in a fresh interpreter and report the slowest imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        raise SystemExit("Importing app.main failed")
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+        imports.append((int(cumulative_us), int(self_us), name))
+
+    total_us = next(cumulative for cumulative, _, name in imports if name == "app.main")
+    print(f"Import app.main: {total_us / 1000:.1f} ms")
+    print(f"Slowest {top} imports (cumulative):")
+    for cumulative, _, name in sorted(imports, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    return total_us / 1000
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_time_to_first_200(timeout: float):
+    """Start uvicorn and poll /health until it answers 200"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy()
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise SystemExit("uvicorn exited before serving a request")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        elapsed_ms = (time.perf_counter() - started) * 1000
+                        print(f"Time to first 200: {elapsed_ms:.1f} ms")
+                        return elapsed_ms
+            except OSError:
+                time.sleep(0.01)
+        raise SystemExit(f"No 200 from {url} within {timeout} seconds")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure ComplianceAI cold start")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for the first 200")
+    args = parser.parse_args()
+
+    measure_import_time(args.top)
+    print("-" * 50)
+    measure_time_to_first_200(args.timeout)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Claude Messages API with injectable latency and errors.
+Use it to exercise timeouts, the circuit breaker and the fallback path:
+
+    python fake_claude_server.py --latency 5 --error-rate 0.5
+    CLAUDE_BASE_URL=http://127.0.0.1:8765 CLAUDE_API_KEY=fake python run.py
+"""
+
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Compact analysis in the record_analysis tool format
+ANALYSIS = {
+    "s": "Fake analysis returned by the local test server.",
+    "sc": 70,
+    "r": [
+        {"p": "Delete a user's data within 30 days when they ask.", "c": "D", "pr": "H", "g": [0], "cf": 0.9},
+        {"p": "Report breaches within three days.", "c": "S", "pr": "C", "g": [0, 1], "cf": 0.85}
+    ]
+}
+
+ANSWER = "Fake answer from the local test server [1]."
+
+class FakeClaudeHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    error_rate = 0.0
+    error_status = 529
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        time.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            self._send(self.error_status, {
+                "type": "error",
+                "error": {"type": "overloaded_error", "message": "Injected failure"}
+            })
+            return
+
+        self._send(200, {
+            "id": "msg_fake",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "fake"),
+            "content": [self._content(request)],
+            "stop_reason": "tool_use" if request.get("tools") else "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 100, "output_tokens": 50}
+        })
+
+    def _content(self, request: dict) -> dict:
+        tools = request.get("tools")
+        if tools:
+            return {"type": "tool_use", "id": "toolu_fake", "name": tools[0]["name"], "input": ANALYSIS}
+        return {"type": "text", "text": ANSWER}
+
+    def _send(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Claude API for fault-injection testing")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before responding")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0.0-1.0)")
+    parser.add_argument("--error-status", type=int, default=529, help="HTTP status for injected failures")
+    args = parser.parse_args()
+
+    FakeClaudeHandler.latency = args.latency
+    FakeClaudeHandler.error_rate = args.error_rate
+    FakeClaudeHandler.error_status = args.error_status
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), FakeClaudeHandler)
+    print(f"Fake Claude API on http://127.0.0.1:{args.port} "
+          f"(latency={args.latency}s, error_rate={args.error_rate})")
+    server.serve_forever()
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Recompute every document's compliance score from its stored requirements.
+Run after changing the SCORE_* weight settings; no Claude calls are made:
+
+    SCORE_PRIORITY_POINTS='{"critical": 15, "high": 6, "medium": 3, "low": 1}' python rescore_documents.py
+"""
+
+import time
+
+from app.core.database import Base, engine
+from app.services.compliance_scorer import compliance_scorer
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+
+    started = time.perf_counter()
+    result = compliance_scorer.rescore_all()
+    elapsed = time.perf_counter() - started
+
+    print(f"Rescored {result['scored']} documents in {elapsed:.2f}s ({result['changed']} changed)")
@@ -4,7 +4,6 @@ Simple script to run the ComplianceAI FastAPI application
 """
 
 import uvicorn
-from app.main import app
 
 if __name__ == "__main__":
     print("Starting ComplianceAI server...")